@@ -0,0 +1,219 @@
+# bitboard.py - Breadth-first search over whole wavefronts, with the grid packed into big integers
+from utils import *
+
+BARRIER = STATES['BLACK']
+CHECKPOINT_EVERY = 64   # how many BFS layers pass between two stored (frontier, unvisited) pairs
+TILE = 64               # tiles are TILE x TILE cells, one Python integer each
+
+# maps every cell state to the ASCII digit of its bit: '0' for barriers, '1' for everything else
+_FREE_DIGITS = bytes(ord('0') if state == BARRIER else ord('1') for state in range(256))
+
+# masks over the bits of a tile (bit y * TILE + x is the cell at x, y in the tile)
+_FULL = (1 << TILE * TILE) - 1
+_FIRST_COLUMN = sum(1 << (y * TILE) for y in range(TILE))
+_LAST_COLUMN = _FIRST_COLUMN << (TILE - 1)
+_FIRST_LINE = (1 << TILE) - 1
+_LAST_LINE = _FIRST_LINE << (TILE * (TILE - 1))
+_NOT_FIRST_COLUMN = _FULL ^ _FIRST_COLUMN
+_NOT_LAST_COLUMN = _FULL ^ _LAST_COLUMN
+
+
+class Bitboard:
+    def __init__(self, rows: int, cols: int, free: list[int]):
+        """
+        A grid stored as bits of Python integers, one integer per TILE x TILE tile of cells.
+        A set of cells (a frontier) is a {tile: bits} dict holding only its non-empty tiles, so moving a
+        wavefront one step is a handful of shifts and masks done in C on the tiles it touches: the work
+        follows the size of the wavefront, not the size of the grid. Use Bitboard.from_cells() to make one.
+        Args:
+            rows (int): Number of rows in the grid (the number of cells along the x axis).
+            cols (int): Number of columns in the grid.
+            free (list[int]): The bitmap of the cells that are not barriers, for every tile
+                (tile ty * tiles_x + tx covers the cells TILE * tx.. along x and TILE * ty.. along y).
+        """
+        self.rows: int = rows
+        self.cols: int = cols
+        self.free: list[int] = free
+        self.tiles_x: int = -(-rows // TILE)
+        self.tiles_y: int = -(-cols // TILE)
+
+    @classmethod
+    def from_cells(cls, rows: int, cols: int, cells: bytes) -> "Bitboard":
+        """
+        Build the bitboard of a cells array (see Grid.cells).
+        Args:
+            rows (int): Number of rows in the grid.
+            cols (int): Number of columns in the grid.
+            cells (bytes): The state of every cell.
+        Returns:
+            Bitboard: The bitboard of the cells.
+        """
+        # every line of a tile becomes TILE binary digits in one C pass (padded with barriers past
+        # the edge of the grid); reversed, so that the first cell of the tile is bit 0
+        digits = bytes(cells).translate(_FREE_DIGITS)
+        empty_line = b'0' * TILE
+        free = []
+        for y0 in range(0, cols, TILE):
+            for x0 in range(0, rows, TILE):
+                lines = [digits[y * rows + x0:y * rows + min(x0 + TILE, rows)].ljust(TILE, b'0')
+                         for y in range(y0, min(y0 + TILE, cols))]
+                lines += [empty_line] * (TILE - len(lines))
+                free.append(int(b''.join(lines)[::-1], 2))
+        return cls(rows, cols, free)
+
+    @classmethod
+    def from_grid(cls, grid: "Grid") -> "Bitboard":
+        """
+        Build the bitboard of the current barriers of a grid.
+        Args:
+            grid (Grid): The grid.
+        Returns:
+            Bitboard: The bitboard of the grid.
+        """
+        return cls.from_cells(grid.rows, grid.cols, grid.cells)
+
+    def locate(self, index: int) -> tuple[int, int]:
+        """
+        Find where a cell is stored.
+        Args:
+            index (int): The index of the cell (see Grid.cells).
+        Returns:
+            tuple[int, int]: (tile, bit) of the cell.
+        """
+        x, y = index % self.rows, index // self.rows
+        return (y // TILE) * self.tiles_x + x // TILE, (y % TILE) * TILE + x % TILE
+
+    def expand(self, frontier: dict[int, int], unvisited: list[int]) -> dict[int, int]:
+        """
+        Move a wavefront one step: get the unvisited free cells next to it, and mark them visited.
+        Args:
+            frontier (dict[int, int]): The cells of the wavefront, {tile: bits} for its non-empty tiles.
+            unvisited (list[int]): The free cells not visited yet, for every tile; updated.
+        Returns:
+            dict[int, int]: The next wavefront.
+        """
+        tiles_x, tiles = self.tiles_x, len(self.free)
+        spread = {}
+        for tile, bits in frontier.items():
+            spread[tile] = spread.get(tile, 0) | ((bits << 1) & _NOT_FIRST_COLUMN) | ((bits >> 1) & _NOT_LAST_COLUMN) \
+                | ((bits << TILE) & _FULL) | (bits >> TILE)
+            # the cells on the borders of the tile also step into the neighboring tiles
+            if bits & _LAST_COLUMN and (tile + 1) % tiles_x:
+                spread[tile + 1] = spread.get(tile + 1, 0) | ((bits & _LAST_COLUMN) >> (TILE - 1))
+            if bits & _FIRST_COLUMN and tile % tiles_x:
+                spread[tile - 1] = spread.get(tile - 1, 0) | ((bits & _FIRST_COLUMN) << (TILE - 1))
+            if bits & _LAST_LINE and tile + tiles_x < tiles:
+                spread[tile + tiles_x] = spread.get(tile + tiles_x, 0) | (bits >> (TILE * (TILE - 1)))
+            if bits & _FIRST_LINE and tile >= tiles_x:
+                spread[tile - tiles_x] = spread.get(tile - tiles_x, 0) | ((bits & _FIRST_LINE) << (TILE * (TILE - 1)))
+
+        next_frontier = {}
+        for tile, bits in spread.items():
+            bits &= unvisited[tile]
+            if bits:
+                unvisited[tile] ^= bits
+                next_frontier[tile] = bits
+        return next_frontier
+
+    def layers(self, start: int):
+        """
+        Walk the BFS layers from a cell.
+        Args:
+            start (int): The index of the start cell.
+        Yields:
+            tuple[dict[int, int], list[int]]: (frontier, unvisited) for distances 0, 1, 2, ... until every
+                reachable cell is visited. `unvisited` is updated in place, copy it to keep it.
+        """
+        tile, bit = self.locate(start)
+        if not self.free[tile] >> bit & 1:
+            return
+        unvisited = list(self.free)
+        unvisited[tile] ^= 1 << bit
+        frontier = {tile: 1 << bit}
+        while frontier:
+            yield frontier, unvisited
+            frontier = self.expand(frontier, unvisited)
+
+    def distance(self, start: int, end: int) -> int | None:
+        """
+        Get the length of the shortest path between two cells.
+        Args:
+            start (int): The index of the first cell.
+            end (int): The index of the second cell.
+        Returns:
+            int | None: The number of steps, or None if there is no path.
+        """
+        tile, bit = self.locate(end)
+        for depth, (frontier, _) in enumerate(self.layers(start)):
+            if frontier.get(tile, 0) >> bit & 1:
+                return depth
+        return None
+
+    def _neighbors(self, index: int) -> list[int]:
+        """
+        Get the cells next to a cell (barriers included).
+        Args:
+            index (int): The index of the cell.
+        Returns:
+            list[int]: The indices of the neighbors.
+        """
+        rows, x = self.rows, index % self.rows
+        neighbors = []
+        if x + 1 < rows:
+            neighbors.append(index + 1)
+        if x > 0:
+            neighbors.append(index - 1)
+        if index + rows < rows * self.cols:
+            neighbors.append(index + rows)
+        if index >= rows:
+            neighbors.append(index - rows)
+        return neighbors
+
+    def shortest_path(self, start: int, end: int, step: callable = None) -> list[int] | None:
+        """
+        Find a shortest path between two cells.
+        Going forward, only every CHECKPOINT_EVERY-th layer is kept; going back from the end, the
+        layers between two checkpoints are recomputed, so memory stays small on large maps.
+        Args:
+            start (int): The index of the start cell.
+            end (int): The index of the end cell.
+            step (callable): Called once per layer (e.g. the draw callback of a search), if given.
+        Returns:
+            list[int] | None: The indices of the cells from start to end, or None if there is no path.
+        """
+        end_tile, end_bit = self.locate(end)
+        checkpoints = []
+        depth = -1
+        for depth, (frontier, unvisited) in enumerate(self.layers(start)):
+            if depth % CHECKPOINT_EVERY == 0:
+                checkpoints.append((frontier, list(unvisited)))  # a copy of the references, the ints are shared
+            if frontier.get(end_tile, 0) >> end_bit & 1:
+                break
+            if step is not None:
+                step()
+        else:
+            return None
+
+        path = [end]
+        segment_start, segment = -1, []
+        current = end
+        for layer_depth in range(depth - 1, -1, -1):
+            if layer_depth < segment_start or not segment:
+                # recompute the layers of the segment that holds layer_depth, from its checkpoint
+                segment_start = layer_depth - layer_depth % CHECKPOINT_EVERY
+                frontier, unvisited = checkpoints[segment_start // CHECKPOINT_EVERY]
+                unvisited = list(unvisited)
+                segment = [frontier]
+                for _ in range(layer_depth - segment_start):
+                    frontier = self.expand(frontier, unvisited)
+                    segment.append(frontier)
+            layer = segment[layer_depth - segment_start]
+            # any neighbor one layer closer to the start will do
+            for neighbor in self._neighbors(current):
+                tile, bit = self.locate(neighbor)
+                if layer.get(tile, 0) >> bit & 1:
+                    current = neighbor
+                    break
+            path.append(current)
+        path.reverse()
+        return path
@@ -0,0 +1,125 @@
+# client.py - asyncio client for the local path planning service (see service.py)
+import asyncio
+import itertools
+import json
+
+from service import DEFAULT_SOCKET
+
+
+class PlannerError(Exception):
+    """Raised when the service answers a request with an error."""
+
+
+class PlannerClient:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        A connection to the planning service. Requests can be sent concurrently over the same
+        connection; responses are matched to their requests by id. Use PlannerClient.connect() to make one.
+        Args:
+            reader (asyncio.StreamReader): The incoming side of the connection.
+            writer (asyncio.StreamWriter): The outgoing side of the connection.
+        """
+        self.reader = reader
+        self.writer = writer
+        self.ids = itertools.count()
+        self.waiting: dict[int, asyncio.Future] = {}
+        self.receiver: asyncio.Task = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect(cls, socket_path: str = DEFAULT_SOCKET, host: str = '127.0.0.1', port: int = None) -> "PlannerClient":
+        """
+        Connect to the service.
+        Args:
+            socket_path (str): The path of its UNIX socket.
+            host (str): Its host, when `port` is given.
+            port (int): Its TCP port; if None, the UNIX socket is used.
+        Returns:
+            PlannerClient: The connected client.
+        """
+        if port is None:
+            reader, writer = await asyncio.open_unix_connection(socket_path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _receive(self) -> None:
+        try:
+            while line := await self.reader.readline():
+                response = json.loads(line)
+                future = self.waiting.pop(response.get('id'), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            for future in self.waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("connection to the planning service closed"))
+
+    async def request(self, op: str, **fields) -> dict:
+        """
+        Send a request and wait for its response.
+        Args:
+            op (str): The operation.
+            **fields: The other fields of the request.
+        Returns:
+            dict: The response.
+        """
+        request_id = next(self.ids)
+        future = self.waiting[request_id] = asyncio.get_running_loop().create_future()
+        self.writer.write(json.dumps({'id': request_id, 'op': op, **fields}).encode() + b'\n')
+        await self.writer.drain()
+        response = await future
+        if not response['ok']:
+            raise PlannerError(response['error'])
+        return response
+
+    async def path(self, start: tuple[int, int], end: tuple[int, int]) -> list[tuple[int, int]] | None:
+        """
+        Get a shortest path.
+        Args:
+            start (tuple[int, int]): The (row, col) of the start cell.
+            end (tuple[int, int]): The (row, col) of the end cell.
+        Returns:
+            list[tuple[int, int]] | None: The (row, col) of the cells from start to end, or None if there is no path.
+        """
+        response = await self.request('path', start=list(start), end=list(end))
+        return None if response['path'] is None else [tuple(cell) for cell in response['path']]
+
+    async def distance(self, start: tuple[int, int], end: tuple[int, int]) -> int | None:
+        """
+        Get the length of a shortest path.
+        Args:
+            start (tuple[int, int]): The (row, col) of the start cell.
+            end (tuple[int, int]): The (row, col) of the end cell.
+        Returns:
+            int | None: The number of steps, or None if there is no path.
+        """
+        return (await self.request('distance', start=list(start), end=list(end)))['distance']
+
+    async def info(self) -> dict:
+        """
+        Get the size of the map.
+        Returns:
+            dict: {'rows': ..., 'cols': ...}.
+        """
+        response = await self.request('info')
+        return {'rows': response['rows'], 'cols': response['cols']}
+
+    async def stats(self) -> dict:
+        """
+        Get the latency percentiles and batching counters of the service.
+        Returns:
+            dict: The statistics.
+        """
+        response = await self.request('stats')
+        del response['id'], response['ok']
+        return response
+
+    async def close(self) -> None:
+        """
+        Close the connection.
+        Returns:
+            None
+        """
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.receiver.cancel()
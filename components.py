@@ -0,0 +1,227 @@
+# components.py - Connected components of the free cells, kept up to date while barriers are edited
+from array import array
+from collections import deque
+
+from utils import *
+
+BARRIER = STATES['BLACK']
+
+# the 8 cells around a cell, in order, so that consecutive ones are side by side
+RING = [(-1, -1), (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0)]
+
+
+class ComponentIndex:
+    def __init__(self, rows: int, cols: int, cells: bytearray):
+        """
+        Label every free cell of a grid with the id of its connected component, so that two cells
+        can be checked for a path between them in (almost) constant time.
+        Labels are merged with a union-find when a barrier is removed; when a barrier is added,
+        only the part of the component that got cut off (if any) is relabeled.
+        Args:
+            rows (int): Number of rows in the grid.
+            cols (int): Number of columns in the grid.
+            cells (bytearray): The cells array of the grid (see Grid.cells), read to know which cells are barriers.
+        """
+        self.rows: int = rows
+        self.cols: int = cols
+        self.cells: bytearray = cells
+        self.labels: array = array('i')   # label of each cell, -1 for barriers
+        self.parent: array = array('i')   # union-find over the labels
+        self.rebuild()
+
+    def _neighbors(self, index: int) -> list[int]:
+        """
+        Get the indices of the (up to 4) cells next to a cell.
+        Args:
+            index (int): The index of the cell in the cells array.
+        Returns:
+            list[int]: The indices of the neighbor cells inside the grid.
+        """
+        row, col = index % self.rows, index // self.rows
+        neighbors = []
+        if row > 0:
+            neighbors.append(index - 1)
+        if row < self.rows - 1:
+            neighbors.append(index + 1)
+        if col > 0:
+            neighbors.append(index - self.rows)
+        if col < self.cols - 1:
+            neighbors.append(index + self.rows)
+        return neighbors
+
+    def _new_label(self) -> int:
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def find(self, label: int) -> int:
+        """
+        Get the representative of a label (union-find with path halving).
+        Args:
+            label (int): A component label.
+        Returns:
+            int: The label all the labels of the same component resolve to.
+        """
+        parent = self.parent
+        while parent[label] != label:
+            parent[label] = parent[parent[label]]
+            label = parent[label]
+        return label
+
+    def rebuild(self) -> None:
+        """
+        Label all the cells from scratch.
+        Returns:
+            None
+        """
+        size = self.rows * self.cols
+        if BARRIER not in self.cells:
+            # no barriers: everything is one component
+            self.labels = array('i', bytes(4 * size))
+            self.parent = array('i', [0])
+            return
+
+        self.labels = array('i', [-1]) * size
+        self.parent = array('i')
+        for index in range(size):
+            if self.labels[index] != -1 or self.cells[index] == BARRIER:
+                continue
+            label = self._new_label()
+            self.labels[index] = label
+            queue = deque([index])
+            while queue:
+                current = queue.popleft()
+                for neighbor in self._neighbors(current):
+                    if self.labels[neighbor] == -1 and self.cells[neighbor] != BARRIER:
+                        self.labels[neighbor] = label
+                        queue.append(neighbor)
+
+    def connected(self, a: int, b: int) -> bool:
+        """
+        Checks if there is a path between two cells.
+        Args:
+            a (int): The index of the first cell.
+            b (int): The index of the second cell.
+        Returns:
+            bool: True if both cells are free and in the same component, False otherwise.
+        """
+        label_a, label_b = self.labels[a], self.labels[b]
+        if label_a < 0 or label_b < 0:
+            return False
+        return self.find(label_a) == self.find(label_b)
+
+    def update(self, index: int) -> None:
+        """
+        Update the labels after a cell became a barrier or stopped being one (as told by the cells array).
+        Args:
+            index (int): The index of the cell that changed.
+        Returns:
+            None
+        """
+        if self.cells[index] == BARRIER:
+            self._barrier_added(index)
+        else:
+            self._barrier_removed(index)
+
+    def _barrier_removed(self, index: int) -> None:
+        """
+        Join the cell with the components around it.
+        Args:
+            index (int): The index of the cell that is now free.
+        Returns:
+            None
+        """
+        roots = {self.find(self.labels[n]) for n in self._neighbors(index) if self.labels[n] >= 0}
+        if not roots:
+            self.labels[index] = self._new_label()
+            return
+        root = roots.pop()
+        for other in roots:
+            self.parent[other] = root
+        self.labels[index] = root
+
+    def _ring_connected(self, index: int) -> bool:
+        """
+        Checks if the free neighbors of a cell are still connected through the 8 cells around it,
+        which is the common case when a barrier is drawn and saves a search.
+        Args:
+            index (int): The index of the cell that became a barrier.
+        Returns:
+            bool: True if the free neighbors are connected around the cell, False if it is not known.
+        """
+        row, col = index % self.rows, index // self.rows
+        free = []
+        for dx, dy in RING:
+            r, c = row + dx, col + dy
+            free.append(0 <= r < self.rows and 0 <= c < self.cols and self.cells[c * self.rows + r] != BARRIER)
+        if all(free):
+            return True
+        # walk the ring starting after a blocked cell and count the arcs that hold a free side neighbor
+        start = free.index(False)
+        arcs_with_neighbors = 0
+        arc_has_neighbor = False
+        for step in range(1, 9):
+            position = (start + step) % 8
+            if free[position]:
+                # the side neighbors are at the odd positions of RING
+                arc_has_neighbor = arc_has_neighbor or position % 2 == 1
+            else:
+                arcs_with_neighbors += arc_has_neighbor
+                arc_has_neighbor = False
+        return arcs_with_neighbors <= 1
+
+    def _barrier_added(self, index: int) -> None:
+        """
+        Remove the cell from its component, relabeling the parts that got disconnected.
+        The parts are explored side by side, one cell at a time each, and a part that runs out of
+        cells before meeting the others is given a new label; the search stops as soon as a single
+        part is left, so the cost is about the size of the parts that were cut off.
+        Args:
+            index (int): The index of the cell that is now a barrier.
+        Returns:
+            None
+        """
+        self.labels[index] = -1
+        seeds = [n for n in self._neighbors(index) if self.cells[n] != BARRIER]
+        if len(seeds) <= 1 or self._ring_connected(index):
+            return
+
+        owner = {seed: k for k, seed in enumerate(seeds)}
+        queues = [deque([seed]) for seed in seeds]
+        group = list(range(len(seeds)))  # union-find over the parts, merged when two of them meet
+        done = set()
+
+        def group_of(k: int) -> int:
+            while group[k] != k:
+                k = group[k]
+            return k
+
+        live = len(seeds)
+        while live > 1:
+            for k, queue in enumerate(queues):
+                if not queue:
+                    continue
+                current = queue.popleft()
+                for neighbor in self._neighbors(current):
+                    if self.cells[neighbor] == BARRIER:
+                        continue
+                    j = owner.get(neighbor)
+                    if j is None:
+                        owner[neighbor] = k
+                        queue.append(neighbor)
+                    elif group_of(j) != group_of(k):
+                        group[group_of(j)] = group_of(k)
+                        live -= 1
+            # a part whose searches all ran dry is a component on its own
+            for k in range(len(seeds)):
+                root = group_of(k)
+                if live <= 1 or root != k or root in done:
+                    continue
+                members = {m for m in range(len(seeds)) if group_of(m) == root}
+                if any(queues[m] for m in members):
+                    continue
+                done.add(root)
+                live -= 1
+                label = self._new_label()
+                for cell, m in owner.items():
+                    if m in members:
+                        self.labels[cell] = label
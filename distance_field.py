@@ -0,0 +1,166 @@
+# distance_field.py - Distance from a set of sources to every cell, computed with NumPy
+import math
+
+import numpy as np
+
+from utils import *
+
+BARRIER = STATES['BLACK']
+DIAGONAL_COST = math.sqrt(2)
+
+
+def free_cells(grid: "Grid") -> np.ndarray:
+    """
+    Get the occupancy of a grid as an array.
+    Args:
+        grid (Grid): The grid.
+    Returns:
+        np.ndarray: A (cols, rows) boolean array, True where the cell is not a barrier. Flattened, it is
+        indexed like Grid.cells, i.e. the cell (row, col) is at [col, row].
+    """
+    return np.frombuffer(grid.cells, dtype=np.uint8).reshape(grid.cols, grid.rows) != BARRIER
+
+
+def _moves(width: int, diagonal: bool) -> list[tuple[int, float, tuple[int, ...]]]:
+    """
+    Get the moves allowed on a flattened padded grid of the given width.
+    Args:
+        width (int): The width of the padded grid.
+        diagonal (bool): Whether diagonal moves are allowed.
+    Returns:
+        list[tuple[int, float, tuple[int, ...]]]: (offset, cost, offsets of the cells that must be free to cut the corner).
+    """
+    moves = [(1, 1.0, ()), (-1, 1.0, ()), (width, 1.0, ()), (-width, 1.0, ())]
+    if diagonal:
+        for dx in (-1, 1):
+            for dy in (-width, width):
+                moves.append((dx + dy, DIAGONAL_COST, (dx, dy)))
+    return moves
+
+
+def distance_field(free: np.ndarray, sources: list[int], diagonal: bool = False, cost: np.ndarray = None) -> np.ndarray:
+    """
+    Compute the distance from the nearest source to every cell.
+    The grid is padded with a border of barriers and flattened, so the neighbors of a whole set of
+    cells are found with one vectorized addition per move. Without weights the wavefront is expanded
+    one BFS layer per iteration; with diagonal moves (chamfer costs 1 and sqrt(2)) or per-cell costs,
+    the cells whose distance improved are relaxed again until no distance changes.
+    Args:
+        free (np.ndarray): The (cols, rows) occupancy array, see free_cells().
+        sources (list[int]): The indices (as in Grid.cells) of the source cells.
+        diagonal (bool): Whether diagonal moves are allowed. They never cut the corner of a barrier.
+        cost (np.ndarray): Optional (cols, rows) array with the cost of entering each cell (1 by default).
+    Returns:
+        np.ndarray: A (cols, rows) float array of distances, inf for the cells that cannot be reached.
+    """
+    height, width = free.shape
+    padded_width = width + 2
+    padded = np.zeros((height + 2, padded_width), dtype=bool)
+    padded[1:-1, 1:-1] = free
+    padded = padded.ravel()
+
+    sources = np.asarray(sources, dtype=np.int64)
+    active = (sources // width + 1) * padded_width + sources % width + 1
+    active = np.unique(active[padded[active]])
+
+    distance = np.full(padded.size, np.inf)
+    distance[active] = 0.0
+    moves = _moves(padded_width, diagonal)
+
+    if not diagonal and cost is None:
+        # plain BFS: every cell is reached once, by the first wavefront that touches it
+        depth = 0.0
+        while active.size:
+            depth += 1
+            neighbors = (active[:, None] + np.array([offset for offset, _, _ in moves])).ravel()
+            neighbors = np.unique(neighbors[padded[neighbors] & np.isinf(distance[neighbors])])
+            distance[neighbors] = depth
+            active = neighbors
+    else:
+        padded_cost = np.ones(padded.size)
+        if cost is not None:
+            padded_cost.reshape(height + 2, padded_width)[1:-1, 1:-1] = cost
+        while active.size:
+            improved = []
+            for offset, step, corners in moves:
+                neighbors = active + offset
+                allowed = padded[neighbors]
+                for corner in corners:
+                    allowed &= padded[active + corner]
+                origin, neighbors = active[allowed], neighbors[allowed]
+                candidate = distance[origin] + step * padded_cost[neighbors]
+                better = candidate < distance[neighbors]
+                np.minimum.at(distance, neighbors[better], candidate[better])
+                improved.append(neighbors[better])
+            active = np.unique(np.concatenate(improved))
+
+    return distance.reshape(height + 2, padded_width)[1:-1, 1:-1].copy()
+
+
+def descend(field: np.ndarray, start: int, diagonal: bool = False, cost: np.ndarray = None) -> list[int] | None:
+    """
+    Follow the distance field downhill from a cell to the nearest source.
+    Args:
+        field (np.ndarray): A (cols, rows) field computed by distance_field().
+        start (int): The index of the cell to start from.
+        diagonal (bool): Whether the field was computed with diagonal moves.
+        cost (np.ndarray): The per-cell costs the field was computed with, if any.
+    Returns:
+        list[int] | None: The indices of the cells from `start` to a source, or None if `start` is unreachable.
+    """
+    height, width = field.shape
+    flat = field.ravel()
+    flat_cost = cost.ravel() if cost is not None else None
+    if not np.isfinite(flat[start]):
+        return None
+    steps = [(1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0)]
+    if diagonal:
+        steps += [(1, 1, DIAGONAL_COST), (1, -1, DIAGONAL_COST), (-1, 1, DIAGONAL_COST), (-1, -1, DIAGONAL_COST)]
+    path = [start]
+    current = start
+    while flat[current] > 0:
+        row, col = current % width, current // width
+        # entering the current cell costs its weight times the length of the step
+        weight = 1.0 if flat_cost is None else flat_cost[current]
+        # the neighbor the distance came from: the one with the smallest distance plus cost of the step,
+        # which is the distance of the current cell (the lowest neighbor is not always on a shortest path)
+        best, best_value = current, np.inf
+        for dx, dy, step_cost in steps:
+            r, c = row + dx, col + dy
+            if not (0 <= r < width and 0 <= c < height):
+                continue
+            value = flat[c * width + r] + step_cost * weight
+            if value >= best_value or not flat[c * width + r] < flat[current]:
+                continue
+            # like the field, never cut the corner of a barrier: both side cells must be free (a free cell
+            # next to a reachable one is reachable, so its distance is finite, while barriers are inf)
+            if dx and dy and not (np.isfinite(flat[col * width + r]) and np.isfinite(flat[c * width + row])):
+                continue
+            best, best_value = c * width + r, value
+        if best == current:
+            return None
+        current = best
+        path.append(current)
+    return path
+
+
+def heatmap(field: np.ndarray, free: np.ndarray = None) -> np.ndarray:
+    """
+    Color a distance field, from blue (near the sources) to red (far); unreachable cells keep the background color.
+    Args:
+        field (np.ndarray): A (cols, rows) field computed by distance_field().
+        free (np.ndarray): The occupancy the field was computed on; if given, barriers are colored as barriers.
+    Returns:
+        np.ndarray: A (cols, rows, 3) array of RGB colors.
+    """
+    reachable = np.isfinite(field)
+    top = field[reachable].max() if reachable.any() else 0.0
+    t = np.where(reachable, field, 0.0) / (top if top > 0 else 1.0)
+    rgb = np.empty(field.shape + (3,), dtype=np.uint8)
+    rgb[..., 0] = (255 * t).astype(np.uint8)
+    rgb[..., 1] = (80 * (1 - abs(2 * t - 1))).astype(np.uint8)
+    rgb[..., 2] = (255 * (1 - t)).astype(np.uint8)
+    rgb[~reachable] = COLORS['BACKGROUND']
+    if free is not None:
+        rgb[~free] = COLORS['BLACK']
+    return rgb
@@ -0,0 +1,135 @@
+# flowfield.py - One search towards a goal, shared by every agent heading there
+from array import array
+from collections import OrderedDict
+
+import numpy as np
+
+from distance_field import free_cells, distance_field
+
+# direction codes (2 bits): the (row, col) step to take from a cell
+DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+
+
+class FlowField:
+    def __init__(self, rows: int, cols: int, goal: int, directions: bytes, reachable: bytes):
+        """
+        The next step towards a goal from every cell, packed into 2 bits per cell (plus 1 bit saying
+        whether the goal can be reached at all), so a path is a walk through a table, in O(path length).
+        Use FlowField.build() to make one.
+        Args:
+            rows (int): Number of rows in the grid.
+            cols (int): Number of columns in the grid.
+            goal (int): The index of the goal cell.
+            directions (bytes): The direction codes, 4 cells per byte, lowest bits first.
+            reachable (bytes): The reachability bits, 8 cells per byte, lowest bit first.
+        """
+        self.rows: int = rows
+        self.cols: int = cols
+        self.goal: int = goal
+        self.directions: bytes = directions
+        self.reachable: bytes = reachable
+        self.offsets: list[int] = [dx + dy * rows for dx, dy in DIRECTIONS]
+
+    @classmethod
+    def build(cls, grid: "Grid", goal: int) -> "FlowField":
+        """
+        Compute the flow field of a grid towards a goal, with one BFS from the goal
+        (moves are symmetric, so distances to the goal are distances from it).
+        Args:
+            grid (Grid): The grid.
+            goal (int): The index of the goal cell.
+        Returns:
+            FlowField: The flow field.
+        """
+        distance = distance_field(free_cells(grid), [goal])
+        height, width = distance.shape
+        padded = np.full((height + 2, width + 2), np.inf)
+        padded[1:-1, 1:-1] = distance
+
+        # the first direction that leads to a cell one step closer to the goal
+        codes = np.zeros(distance.shape, dtype=np.uint8)
+        chosen = np.zeros(distance.shape, dtype=bool)
+        for code, (dx, dy) in enumerate(DIRECTIONS):
+            neighbor = padded[1 + dy:1 + dy + height, 1 + dx:1 + dx + width]
+            downhill = ~chosen & (neighbor == distance - 1)
+            codes[downhill] = code
+            chosen |= downhill
+
+        codes = codes.ravel()
+        codes = np.concatenate([codes, np.zeros(-codes.size % 4, dtype=np.uint8)]).reshape(-1, 4)
+        directions = codes[:, 0] | (codes[:, 1] << 2) | (codes[:, 2] << 4) | (codes[:, 3] << 6)
+        reachable = np.packbits(np.isfinite(distance).ravel(), bitorder='little')
+        return cls(grid.rows, grid.cols, goal, directions.tobytes(), reachable.tobytes())
+
+    def is_reachable(self, index: int) -> bool:
+        """
+        Checks if the goal can be reached from a cell.
+        Args:
+            index (int): The index of the cell.
+        Returns:
+            bool: True if there is a path from the cell to the goal, False otherwise.
+        """
+        return bool(self.reachable[index >> 3] >> (index & 7) & 1)
+
+    def direction(self, index: int) -> tuple[int, int] | None:
+        """
+        Get the step to take from a cell.
+        Args:
+            index (int): The index of the cell.
+        Returns:
+            tuple[int, int] | None: The (row, col) step, or None at the goal and where the goal cannot be reached.
+        """
+        if index == self.goal or not self.is_reachable(index):
+            return None
+        return DIRECTIONS[self.directions[index >> 2] >> ((index & 3) << 1) & 3]
+
+    def path(self, start: int) -> array | None:
+        """
+        Follow the field from a cell to the goal.
+        Args:
+            start (int): The index of the start cell.
+        Returns:
+            array | None: array('i') of the cell indices from start to goal, or None if the goal cannot be reached.
+        """
+        if not self.is_reachable(start):
+            return None
+        directions, offsets, goal = self.directions, self.offsets, self.goal
+        path = array('i', [start])
+        current = start
+        while current != goal:
+            current += offsets[directions[current >> 2] >> ((current & 3) << 1) & 3]
+            path.append(current)
+        return path
+
+
+class FlowFieldCache:
+    def __init__(self, size: int = 16):
+        """
+        Keep the flow fields of the most recently used goals of a grid, dropping all of them when a barrier changes.
+        Args:
+            size (int): How many goals are kept.
+        """
+        self.size: int = size
+        self.fields: OrderedDict = OrderedDict()
+        self.version: int | None = None
+
+    def get(self, grid: "Grid", goal: int) -> FlowField:
+        """
+        Get the flow field of a grid towards a goal, computing it if it is not cached or out of date.
+        Args:
+            grid (Grid): The grid.
+            goal (int): The index of the goal cell.
+        Returns:
+            FlowField: The flow field.
+        """
+        if self.version != grid.version:
+            self.fields.clear()
+            self.version = grid.version
+        field = self.fields.get(goal)
+        if field is None:
+            field = self.fields[goal] = FlowField.build(grid, goal)
+            if len(self.fields) > self.size:
+                self.fields.popitem(last=False)
+        else:
+            self.fields.move_to_end(goal)
+        return field
@@ -1,8 +1,11 @@
 from utils import *
 from spot import Spot
+from viewport import Viewport
+from components import ComponentIndex
+from paths import ParentMap
 
 class Grid:
-    def __init__(self, win: pygame.Surface, rows: int, cols: int, width: int, height: int):
+    def __init__(self, win: "pygame.Surface", rows: int, cols: int, width: int, height: int):
         """
         Initialize a grid with the given number of rows and columns, of the width and height of the window.
         Args:
@@ -12,12 +15,32 @@ class Grid:
             width (int): Width of the window in pixels.
             height (int): Height of the window in pixels.
         """
-        self.win: pygame.Surface = win
+        self.win: "pygame.Surface" = win
         self.rows: int = rows
         self.cols: int = cols
         self.width: int = width
         self.height: int = height
+        # state of every spot, as a palette index (see STATES), in screen order
+        self.cells: bytearray = bytearray(rows * cols)
+        self.components: ComponentIndex = ComponentIndex(rows, cols, self.cells)
+        self.parents: ParentMap = ParentMap(rows, cols)  # parent pointers of the last search, reused by every search
+        self.trace = None  # the TraceRecorder of the search being recorded, if any (see search_trace.py)
+        self.version: int = 0  # bumped on every barrier change, so caches built from the barriers know when they are stale
         self.grid: list[list[Spot]] = self._make_grid()
+        self.viewport: Viewport = Viewport(rows, cols, width, height)
+        self._renderer: "GridRenderer | None" = None  # created when first drawn, so headless grids never load pygame
+
+    @property
+    def renderer(self) -> "GridRenderer":
+        """
+        The renderer of the grid, created (and pygame imported) the first time it is needed.
+        Returns:
+            GridRenderer: The renderer.
+        """
+        if self._renderer is None:
+            from renderer import GridRenderer
+            self._renderer = GridRenderer(self)
+        return self._renderer
 
     def _make_grid(self) -> list[list[Spot]]:
         """
@@ -31,24 +54,43 @@ class Grid:
         for i in range(self.rows):
             grid.append([])
             for j in range(self.cols):
-                spot = Spot(i, j, spot_width, spot_height, self.rows)
+                spot = Spot(i, j, spot_width, spot_height, self.rows, self)
                 grid[i].append(spot)
         return grid
 
-    def draw_grid_lines(self) -> None:
+    def update_neighbors(self) -> None:
+        """
+        Rebuild the neighbor lists of every spot, after barriers changed and before a search.
+        Returns:
+            None
+        """
+        for row in self.grid:
+            for spot in row:
+                spot.update_neighbors(self.grid)
+
+    def draw_grid_lines(self, surface: "pygame.Surface" = None) -> None:
         """
         Draw the grid lines on the Pygame window.
+        Args:
+            surface (pygame.Surface): The surface to draw on. Defaults to the window of the grid.
         Returns:
             None
         """
-        spot_width = self.width // self.rows  # gap between lines
-        spot_height = self.height // self.cols  # gap between lines
-        for i in range(self.rows):
+        import pygame
+        surface = surface if surface is not None else self.win
+        row_start, col_start, row_end, col_end = self.viewport.visible_cells()
+        left, top = self.viewport.cell_to_screen(row_start, col_start)
+        right, bottom = self.viewport.cell_to_screen(row_end, col_end)
+        left, top = max(0, round(left)), max(0, round(top))
+        right, bottom = min(self.width, round(right)), min(self.height, round(bottom))
+        for j in range(col_start, col_end):
             # draw horizontal lines
-            pygame.draw.line(self.win, COLORS['PINK'], (0, i * spot_height), (self.width, i * spot_height))
-        for j in range(self.cols):
+            y = round(self.viewport.cell_to_screen(row_start, j)[1])
+            pygame.draw.line(surface, COLORS['PINK'], (left, y), (right, y))
+        for i in range(row_start, row_end):
             # draw vertical lines
-            pygame.draw.line(self.win, COLORS['PINK'], (j * spot_width, 0), (j * spot_width, self.height))
+            x = round(self.viewport.cell_to_screen(i, col_start)[0])
+            pygame.draw.line(surface, COLORS['PINK'], (x, top), (x, bottom))
 
     def draw(self) -> None:
         """
@@ -56,30 +98,60 @@ class Grid:
         Returns:
             None
         """
+        import pygame
         self.win.fill(COLORS['BACKGROUND'])
 
-        for row in self.grid:
-            for spot in row:
-                spot.draw(self.win)   # draw each spot
-
-        self.draw_grid_lines()        # draw the grid lines          
+        self.renderer.draw(self.win)  # draw the spots and the grid lines
         pygame.display.update()       # update the display
 
     def get_clicked_pos(self, pos: tuple[int, int]) -> tuple[int, int]:
         """
-        Get the row and column of the grid based on the mouse position.
+        Get the row and column of the grid based on the mouse position, taking zoom and pan into account.
+        The result can be outside the grid.
         Args:
             pos (tuple[int, int]): The (x, y) position of the mouse click.
         Returns:
             tuple[int, int]: The (row, col) position of the clicked spot in the grid.
         """
-        spot_width = self.width // self.cols
-        spot_height = self.height // self.rows
-        x, y = pos
-        col = x // spot_width
-        row = y // spot_height
-        return col, row
+        return self.viewport.screen_to_cell(pos)
     
+    def barrier_changed(self, spot: Spot) -> None:
+        """
+        Called by a spot after it became a barrier or stopped being one.
+        Args:
+            spot (Spot): The spot that changed.
+        Returns:
+            None
+        """
+        self.version += 1
+        self.components.update(spot.index)
+
+    def connected(self, a: Spot, b: Spot) -> bool:
+        """
+        Checks if a path can exist between two spots, without searching for it.
+        Args:
+            a (Spot): The first spot.
+            b (Spot): The second spot.
+        Returns:
+            bool: True if both spots are free and in the same connected component, False otherwise.
+        """
+        return self.components.connected(a.index, b.index)
+
+    def load_barriers(self, barriers: list[int]) -> None:
+        """
+        Turn many spots into barriers at once, e.g. when loading a map, relabeling the components only once.
+        Args:
+            barriers (list[int]): The indices (in the cells array) of the spots to turn into barriers.
+        Returns:
+            None
+        """
+        for index in barriers:
+            spot = self.grid[index % self.rows][index // self.rows]
+            spot.color = COLORS['BLACK']
+            self.cells[index] = STATES['BLACK']
+        self.version += 1
+        self.components.rebuild()
+
     def reset(self) -> None:
         """
         Reset the grid to its initial state.
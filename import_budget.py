@@ -0,0 +1,82 @@
+# import_budget.py - Checks that the headless modules load fast and without pygame
+#
+# Short-lived batch workers import the search and grid modules thousands of times a day, so their import
+# time is measured in fresh interpreters and compared with a budget. Exits with status 1 if the budget is
+# exceeded or if pygame gets imported. Run with -X importtime details with --details.
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# the modules usable without a window
+HEADLESS_MODULES = ['utils', 'paths', 'components', 'bitboard', 'spot', 'viewport', 'grid', 'searching_algorithms',
+                    'maps', 'multi_agent', 'search_trace', 'worker']
+
+_PROBE = """
+import sys, time
+t0 = time.perf_counter()
+import {modules}
+print((time.perf_counter() - t0) * 1000, 'pygame' in sys.modules)
+"""
+
+
+def measure(modules: list[str], runs: int) -> tuple[list[float], bool]:
+    """
+    Import modules in fresh interpreters and time it.
+    Args:
+        modules (list[str]): The modules, imported together.
+        runs (int): Number of interpreters to start.
+    Returns:
+        tuple[list[float], bool]: The import time of every run in milliseconds, and whether pygame got imported.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    times, pygame_loaded = [], False
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', _PROBE.format(modules=', '.join(modules))],
+                                cwd=here, capture_output=True, text=True, check=True).stdout.split()
+        times.append(float(output[-2]))
+        pygame_loaded |= output[-1] == 'True'
+    return times, pygame_loaded
+
+
+def details(modules: list[str], top: int) -> str:
+    """
+    Get the slowest imports, as reported by python -X importtime.
+    Args:
+        modules (list[str]): The modules, imported together.
+        top (int): Number of imports to show.
+    Returns:
+        str: The lines of -X importtime with the largest cumulative times.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    report = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {', '.join(modules)}"],
+                            cwd=here, capture_output=True, text=True, check=True).stderr
+    lines = [line for line in report.splitlines() if line.startswith('import time:') and '|' in line[12:]]
+    lines = [line for line in lines if line.split('|')[1].strip().isdigit()]
+    lines.sort(key=lambda line: int(line.split('|')[1]), reverse=True)
+    return "\n".join(lines[:top])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time budget of the headless modules")
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="largest median import time allowed")
+    parser.add_argument("--runs", type=int, default=7, help="number of fresh interpreters to time")
+    parser.add_argument("--details", action="store_true", help="show the slowest imports (python -X importtime)")
+    args = parser.parse_args()
+
+    times, pygame_loaded = measure(HEADLESS_MODULES, args.runs)
+    median = statistics.median(times)
+    print(f"headless import: median {median:.1f} ms, min {min(times):.1f} ms over {args.runs} runs "
+          f"(budget {args.budget_ms:g} ms)")
+    if args.details:
+        print(details(HEADLESS_MODULES, 15))
+
+    failed = False
+    if pygame_loaded:
+        print("FAIL: pygame was imported by a headless module")
+        failed = True
+    if median > args.budget_ms:
+        print("FAIL: over budget")
+        failed = True
+    sys.exit(1 if failed else 0)
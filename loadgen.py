@@ -0,0 +1,71 @@
+# loadgen.py - Load generator for the local path planning service (see service.py)
+import argparse
+import asyncio
+import random
+import time
+
+from client import PlannerClient
+from profiler import RingHistogram
+from service import DEFAULT_SOCKET
+
+
+async def run_connection(client: PlannerClient, queries: list, concurrency: int, latency: RingHistogram, op: str) -> None:
+    """
+    Send queries over one connection, keeping up to `concurrency` of them in flight.
+    Args:
+        client (PlannerClient): The connection.
+        queries (list): (start, end) pairs; shared with the other connections, which take from it too.
+        concurrency (int): Largest number of requests in flight on this connection.
+        latency (RingHistogram): Where the latency of every request is recorded, in milliseconds.
+        op (str): 'path' or 'distance'.
+    Returns:
+        None
+    """
+    async def send() -> None:
+        while queries:
+            start, end = queries.pop()
+            sent = time.perf_counter()
+            await client.request(op, start=start, end=end)
+            latency.add((time.perf_counter() - sent) * 1000)
+
+    await asyncio.gather(*(send() for _ in range(concurrency)))
+
+
+async def main(args: argparse.Namespace) -> None:
+    clients = [await PlannerClient.connect(args.socket, port=args.port) for _ in range(args.connections)]
+    size = await clients[0].info()
+    rng = random.Random(args.seed)
+
+    def random_cell() -> list[int]:
+        return [rng.randrange(size['rows']), rng.randrange(size['cols'])]
+
+    # a few popular queries, repeated, so that identical concurrent queries get coalesced
+    hot = [(random_cell(), random_cell()) for _ in range(args.hot_queries)]
+    queries = [rng.choice(hot) if hot and rng.random() < args.hot_fraction else (random_cell(), random_cell())
+               for _ in range(args.requests)]
+
+    latency = RingHistogram(args.requests)
+    t0 = time.perf_counter()
+    await asyncio.gather(*(run_connection(client, queries, args.concurrency, latency, args.op) for client in clients))
+    elapsed = time.perf_counter() - t0
+
+    summary = latency.summary()
+    print(f"{args.requests} {args.op} requests in {elapsed:.2f} s: {args.requests / elapsed:.0f} requests/s")
+    print(f"client latency (ms): p50 {summary['p50']:.2f}  p95 {summary['p95']:.2f}  p99 {summary['p99']:.2f}")
+    print(f"service: {await clients[0].stats()}")
+    for client in clients:
+        await client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load generator for the path planning service")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="path of the UNIX socket of the service")
+    parser.add_argument("--port", type=int, default=None, help="connect to this localhost TCP port instead")
+    parser.add_argument("--op", choices=["path", "distance"], default="path")
+    parser.add_argument("--requests", type=int, default=2000, help="total number of requests")
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight per connection")
+    parser.add_argument("--hot-queries", type=int, default=20, help="number of distinct popular queries")
+    parser.add_argument("--hot-fraction", type=float, default=0.3, help="fraction of requests that are popular queries")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -1,10 +1,138 @@
 from utils import *
 from grid import Grid
-from ui import UI
-import pygame
+from maps import load_map
+from profiler import FrameProfiler, profile_search
+from worker import SearchWorker
+from search_trace import Trace, TracePlayer, record_search
+import argparse
+import functools
+import os
+import time
+
+
+def replay(win: "pygame.Surface", path: str, speed: float) -> None:
+    """
+    Replay a recorded search trace (see search_trace.py) until the window is closed.
+    SPACE plays or pauses, [ and ] halve or double the speed, , and . step one frame back or forward,
+    BACKSPACE restarts, clicking or dragging on the bar below the help scrubs, E saves the shown frame as PNG.
+    Zooming and panning work as in the editor.
+    Args:
+        win (pygame.Surface): The Pygame window.
+        path (str): The path of the trace file.
+        speed (float): Search steps replayed per second.
+    Returns:
+        None
+    """
+    import pygame
+    from ui import render_text
+
+    trace = Trace.load(path)
+    grid = Grid(win, trace.rows, trace.cols, GRID_WIDTH, HEIGHT)
+    player = TracePlayer(trace, grid.cells)  # replays straight into the cells drawn by the renderer
+    font = pygame.font.Font(None, 20)
+    bar = pygame.Rect(GRID_WIDTH + 20, HEIGHT - 60, WIDTH - GRID_WIDTH - 40, 12)
+    pan_keys = {pygame.K_LEFT: (-1, 0), pygame.K_RIGHT: (1, 0), pygame.K_UP: (0, -1), pygame.K_DOWN: (0, 1)}
+    clock = pygame.time.Clock()
+    playing = True
+    position = 0.0  # the frame being played, with the fraction of the next one already elapsed
+    last = time.perf_counter()
+    dirty = True
+
+    while True:
+        now = time.perf_counter()
+        if playing:
+            position = min(position + speed * (now - last), trace.frames)
+            player.seek(int(position))
+            playing = not player.at_end()
+            dirty = True
+        last = now
+
+        if dirty:
+            win.fill(COLORS['BACKGROUND'])
+            grid.renderer.draw(win)
+            lines = [f"Replay: {os.path.basename(path)}", f"Step {player.frame} / {trace.frames}",
+                     f"Speed: {speed:g} steps/s", "Playing" if playing else "Paused", "",
+                     "SPACE play / pause", "[ ]  slower / faster", ", .  step back / forward",
+                     "BACKSPACE restart", "E  save frame as PNG", "click the bar to scrub"]
+            for i, line in enumerate(lines):
+                win.blit(render_text(font, line, COLORS['TEXT']), (GRID_WIDTH + 20, 20 + 22 * i))
+            pygame.draw.rect(win, COLORS['BUTTON_BG'], bar)
+            done = bar.width * player.frame // max(1, trace.frames)
+            pygame.draw.rect(win, COLORS['PURPLE'], (bar.x, bar.y, done, bar.height))
+            pygame.display.update()
+            dirty = False
+            clock.tick(FPS)
+
+        events = pygame.event.get()
+        if not events and not playing:
+            event = pygame.event.wait(IDLE_TIMEOUT_MS)
+            if event.type == pygame.NOEVENT:
+                continue
+            events = [event]
+        for event in events:
+            dirty = True
+            if event.type == pygame.QUIT:
+                return
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    if player.at_end():
+                        position = 0.0
+                    playing = not playing
+                elif event.key == pygame.K_LEFTBRACKET:
+                    speed = max(1.0, speed / 2)
+                elif event.key == pygame.K_RIGHTBRACKET:
+                    speed *= 2
+                elif event.key in (pygame.K_COMMA, pygame.K_PERIOD):
+                    playing = False
+                    position = player.frame + (1 if event.key == pygame.K_PERIOD else -1)
+                    player.seek(int(position))
+                elif event.key == pygame.K_BACKSPACE:
+                    position = 0.0
+                    player.seek(0)
+                elif event.key == pygame.K_e:
+                    out = f"{os.path.splitext(path)[0]}-frame-{player.frame:06d}.png"
+                    pygame.image.save(win.subsurface((0, 0, GRID_WIDTH, HEIGHT)), out)
+                    print(f"Frame written to {out}")
+                elif event.key in pan_keys:
+                    dx, dy = pan_keys[event.key]
+                    grid.viewport.pan(dx * GRID_WIDTH / 10, dy * HEIGHT / 10)
+                elif event.key == pygame.K_HOME:
+                    grid.viewport.fit()
+            elif event.type == pygame.MOUSEWHEEL and pygame.mouse.get_pos()[0] < GRID_WIDTH:
+                grid.viewport.zoom(1.25 ** event.y, pygame.mouse.get_pos())
+            elif event.type == pygame.MOUSEMOTION and event.buttons[1]:
+                grid.viewport.pan(-event.rel[0], -event.rel[1])
+            elif event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEMOTION) and pygame.mouse.get_pressed()[0]:
+                x, y = pygame.mouse.get_pos()
+                if bar.inflate(0, 12).collidepoint(x, y):
+                    # scrub: jump to the frame under the mouse
+                    playing = False
+                    position = trace.frames * min(max(x - bar.x, 0), bar.width) / bar.width
+                    player.seek(int(position))
+
 
 if __name__ == "__main__":
 
+    parser = argparse.ArgumentParser(description="Path Visualizing Algorithm")
+    parser.add_argument("--profile", action="store_true",
+                        help="record per-phase frame timings and show the overlay (toggle with F3)")
+    parser.add_argument("--profile-search", metavar="DIR", default=None,
+                        help="dump a cProfile .prof file into DIR for every search run")
+    parser.add_argument("--rows", type=int, default=50, help="number of rows of the grid")
+    parser.add_argument("--cols", type=int, default=50, help="number of columns of the grid")
+    parser.add_argument("--map", default=None, help="load the barriers (and the size) of the grid from a map file")
+    parser.add_argument("--step-delay", type=float, default=0.002,
+                        help="seconds to pause after every search step, so the search can be watched")
+    parser.add_argument("--trace-out", metavar="FILE", default=None,
+                        help="record every search run into this trace file (the last search wins)")
+    parser.add_argument("--replay", metavar="FILE", default=None,
+                        help="replay a recorded search trace instead of editing a grid")
+    parser.add_argument("--replay-speed", type=float, default=200.0, help="search steps replayed per second")
+    args = parser.parse_args()
+
+    # pygame (and the UI built on it) is only loaded once we know the window is needed, so --help stays fast
+    import pygame
+    from ui import UI
     pygame.init()
     # setting up how big will be the display window
     WIN = pygame.display.set_mode((WIDTH, HEIGHT))
@@ -12,10 +140,21 @@ if __name__ == "__main__":
     # set a caption for the window
     pygame.display.set_caption("Path Visualizing Algorithm")
 
-    ROWS = 50  # number of rows
-    COLS = 50  # number of columns
-    grid = Grid(WIN, ROWS, COLS, GRID_WIDTH, HEIGHT)
+    if args.replay:
+        replay(WIN, args.replay, args.replay_speed)
+        pygame.quit()
+        raise SystemExit
+
+    if args.map:
+        grid = load_map(args.map, WIN)
+    else:
+        grid = Grid(WIN, args.rows, args.cols, GRID_WIDTH, HEIGHT)
+    ROWS = grid.rows  # number of rows
+    COLS = grid.cols  # number of columns
     ui = UI(WIN, GRID_WIDTH, WIDTH, HEIGHT)
+    profiler = FrameProfiler(enabled=args.profile)
+
+    PAN_KEYS = {pygame.K_LEFT: (-1, 0), pygame.K_RIGHT: (1, 0), pygame.K_UP: (0, -1), pygame.K_DOWN: (0, 1)}
 
     start = None
     end = None
@@ -23,117 +162,230 @@ if __name__ == "__main__":
     # flags for running the main loop
     run = True
     started = False
+    worker = None  # the search running in the background, if any
+    flow_fields = None  # flow fields of the goals shown so far (created when first needed)
+
+    clock = pygame.time.Clock()
+    # the window is only repainted after something changed
+    dirty = True
 
     while run:
 
-        WIN.fill(COLORS['BACKGROUND'])
-        ui.draw_panel()
+        if worker is not None:
+            # follow the progress of the background search
+            for message, value in worker.poll():
+                dirty = True
+                if message == 'step':
+                    ui.status = f"Searching... {value} steps"
+                    continue
+                if message == 'done':
+                    ui.status = f"Path found ({worker.steps} steps)" if value else f"No path ({worker.steps} steps)"
+                elif message == 'cancelled':
+                    ui.status = "Search cancelled"
+                else:
+                    ui.status = f"Search failed: {value}"
+                worker = None
+                started = False
+                break
 
-        for row in grid.grid:
-            for spot in row:
-                spot.draw(WIN)
-        grid.draw_grid_lines()
+        if dirty:
+            with profiler.phase("panel"):
+                WIN.fill(COLORS['BACKGROUND'])
+                ui.draw_panel()
 
-        pygame.display.update()
+            with profiler.phase("grid"):
+                grid.renderer.draw(WIN)
+
+            profiler.draw_overlay(WIN, ui.small_font)
+            with profiler.phase("display"):
+                pygame.display.update()
+            profiler.end_frame()
+            dirty = False
+            clock.tick(FPS)  # cap the frame rate
 
         #grid.draw()  # draw the grid and its spots
-        for event in pygame.event.get():
-            # verify what events happened
-            if event.type == pygame.QUIT:
-                run = False
+        events = pygame.event.get()
+        if not events:
+            # idle: sleep until something happens instead of spinning on an empty event queue
+            # (while a search runs, only until the next frame is due)
+            event = pygame.event.wait(1000 // FPS if started else IDLE_TIMEOUT_MS)
+            if event.type == pygame.NOEVENT:
                 continue
+            events = [event]
+        dirty = True
+        with profiler.phase("events"):
+            for event in events:
+                # verify what events happened
+                if event.type == pygame.QUIT:
+                    if worker is not None:
+                        worker.cancel(wait=True)
+                    run = False
+                    continue
 
-            ui_action = ui.handle_events(event)
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    profiler.toggle()
+                    continue
 
-            if ui_action["type"] == "reset":
-                start = None
-                end = None
-                grid.reset()
-                started = False
-                continue
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_f:
+                    # toggle the arrows of the flow field towards the end spot
+                    if grid.renderer.flow_field is not None:
+                        grid.renderer.set_flow_field(None)
+                    elif end:
+                        try:
+                            from flowfield import FlowFieldCache
+                        except ImportError:
+                            ui.status = "The flow field needs NumPy"
+                            continue
+                        if flow_fields is None:
+                            flow_fields = FlowFieldCache()
+                        grid.renderer.set_flow_field(flow_fields.get(grid, end.index))
+                    continue
+
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+                    # toggle a heatmap of the distances from the start spot
+                    if grid.renderer.overlay is not None:
+                        grid.renderer.set_overlay(None)
+                    elif start:
+                        try:
+                            from distance_field import free_cells, distance_field, heatmap
+                        except ImportError:
+                            ui.status = "The heatmap needs NumPy"
+                            continue
+                        free = free_cells(grid)
+                        grid.renderer.set_overlay(heatmap(distance_field(free, [start.index]), free))
+                    continue
 
-            if ui_action["type"] == "algorithm_selected":
-                algorithm = ui_action["algorithm"]
-                algo_param = ui_action["param"]
+                ui_action = ui.handle_events(event)
 
-                if not start or not end:
+                if ui_action["type"] == "cancel":
+                    if worker is not None:
+                        worker.cancel()
                     continue
 
-                for row in grid.grid:
-                    for spot in row:
-                        spot.update_neighbors(grid.grid)
+                if ui_action["type"] == "reset":
+                    if worker is not None:
+                        worker.cancel(wait=True)
+                        worker = None
+                        ui.status = ""
+                    start = None
+                    end = None
+                    grid.reset()
+                    grid.renderer.set_overlay(None)
+                    grid.renderer.set_flow_field(None)
+                    started = False
+                    continue
 
-                started = True
-                if algo_param is not None:
-                    algorithm(lambda: grid.draw(), grid, start, end, algo_param)
-                else:
-                    algorithm(lambda: grid.draw(), grid, start, end)
-                started = False
-                continue
+                if ui_action["type"] == "algorithm_selected":
+                    algorithm = ui_action["algorithm"]
+                    algo_param = ui_action["param"]
 
+                    if started or not start or not end:
+                        continue
 
-            if started:
-                # do not allow any other interaction if the algorithm has started
-                continue  # ignore other events if algorithm started
+                    started = True
+                    ui.status = "Preparing the search..."
+                    algo_args = (grid, start, end)
+                    if algo_param is not None:
+                        algo_args += (algo_param,)
+                    if args.trace_out:
+                        algorithm = functools.partial(record_search, algorithm, args.trace_out)
+                    if args.profile_search:
+                        algorithm = functools.partial(profile_search, algorithm, args.profile_search, ui_action["name"])
+                    # the search runs on its own thread, the loop keeps rendering and handling events
+                    # (the neighbors are rebuilt there too: it takes seconds on grids of millions of spots)
+                    worker = SearchWorker(algorithm, algo_args, args.step_delay, prepare=grid.update_neighbors)
+                    worker.start()
+                    continue
 
-            if pygame.mouse.get_pressed()[0]:  # LEFT CLICK
-                pos = pygame.mouse.get_pos()
-                row, col = grid.get_clicked_pos(pos)
 
-                if row >= ROWS or row < 0 or col >= COLS or col < 0:
-                    continue  # ignore clicks outside the grid
+                # zoom with the mouse wheel, pan with the middle button or the arrow keys, HOME shows the whole grid
+                if event.type == pygame.MOUSEWHEEL and ui.is_click_on_grid(pygame.mouse.get_pos()):
+                    grid.viewport.zoom(1.25 ** event.y, pygame.mouse.get_pos())
+                    continue
+                if event.type == pygame.MOUSEMOTION and event.buttons[1]:
+                    grid.viewport.pan(-event.rel[0], -event.rel[1])
+                    continue
+                if event.type == pygame.KEYDOWN and event.key in PAN_KEYS:
+                    dx, dy = PAN_KEYS[event.key]
+                    grid.viewport.pan(dx * GRID_WIDTH / 10, dy * HEIGHT / 10)
+                    continue
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_HOME:
+                    grid.viewport.fit()
+                    continue
 
-                spot = grid.grid[row][col]
-                if not start and spot != end:
-                    start = spot
-                    start.make_start()
-                elif not end and spot != start:
-                    end = spot
-                    end.make_end()
-                elif spot != end and spot != start:
-                    spot.make_barrier()
+                if started:
+                    # do not allow any other interaction if the algorithm has started
+                    continue  # ignore other events if algorithm started
 
-            elif pygame.mouse.get_pressed()[2]:  # RIGHT CLICK
-                pos = pygame.mouse.get_pos()
-                if ui.is_click_on_grid(pos):
+                if pygame.mouse.get_pressed()[0]:  # LEFT CLICK
+                    pos = pygame.mouse.get_pos()
+                    if not ui.is_click_on_grid(pos):
+                        continue
                     row, col = grid.get_clicked_pos(pos)
-                    if 0 <= row < ROWS and 0 <= col < COLS:
-                        spot = grid.grid[row][col]
-                        spot.reset()
-                        if spot == start:
-                            start = None
-                        elif spot == end:
-                            end = None
 
+                    if row >= ROWS or row < 0 or col >= COLS or col < 0:
+                        continue  # ignore clicks outside the grid
+                    grid.renderer.set_overlay(None)  # the heatmap and the flow field are out of date
+                    grid.renderer.set_flow_field(None)
 
+                    spot = grid.grid[row][col]
+                    if not start and spot != end:
+                        start = spot
+                        start.make_start()
+                    elif not end and spot != start:
+                        end = spot
+                        end.make_end()
+                    elif spot != end and spot != start:
+                        spot.make_barrier()
 
+                elif pygame.mouse.get_pressed()[2]:  # RIGHT CLICK
+                    pos = pygame.mouse.get_pos()
+                    if ui.is_click_on_grid(pos):
+                        row, col = grid.get_clicked_pos(pos)
+                        if 0 <= row < ROWS and 0 <= col < COLS:
+                            grid.renderer.set_overlay(None)  # the heatmap and the flow field are out of date
+                            grid.renderer.set_flow_field(None)
+                            spot = grid.grid[row][col]
+                            spot.reset()
+                            if spot == start:
+                                start = None
+                            elif spot == end:
+                                end = None
 
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_c:
-                    start = None
-                    end = None
-                    grid.reset()
-                    started = False
 
-                '''if event.key == pygame.K_SPACE and not started:
-                    # run the algorithm
-                    for row in grid.grid:
-                        for spot in row:
-                            spot.update_neighbors(grid.grid)
-                    # here you can call the algorithms
-                    #bfs(lambda: grid.draw(), grid, start, end)
-                    #dfs(lambda: grid.draw(), grid, start, end)
-                    #astar(lambda: grid.draw(), grid, start, end)
-                    #dls(lambda: grid.draw(), grid, start, end, 1000)
-                    #ucs(lambda: grid.draw(), grid, start, end)
-                    #dijkstra(lambda: grid.draw(), grid, start, end)
-                    #iddfs(lambda: grid.draw(), grid, start, end, 1000)
-                    #ida(lambda: grid.draw(), grid, start, end)
-                    started = False
 
-                if event.key == pygame.K_c:
-                    print("Clearing the grid...")
-                    start = None
-                    end = None
-                    grid.reset()'''
+
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_c:
+                        start = None
+                        end = None
+                        grid.reset()
+                        grid.renderer.set_overlay(None)
+                        grid.renderer.set_flow_field(None)
+                        started = False
+
+                    '''if event.key == pygame.K_SPACE and not started:
+                        # run the algorithm
+                        for row in grid.grid:
+                            for spot in row:
+                                spot.update_neighbors(grid.grid)
+                        # here you can call the algorithms
+                        #bfs(lambda: grid.draw(), grid, start, end)
+                        #dfs(lambda: grid.draw(), grid, start, end)
+                        #astar(lambda: grid.draw(), grid, start, end)
+                        #dls(lambda: grid.draw(), grid, start, end, 1000)
+                        #ucs(lambda: grid.draw(), grid, start, end)
+                        #dijkstra(lambda: grid.draw(), grid, start, end)
+                        #iddfs(lambda: grid.draw(), grid, start, end, 1000)
+                        #ida(lambda: grid.draw(), grid, start, end)
+                        started = False
+
+                    if event.key == pygame.K_c:
+                        print("Clearing the grid...")
+                        start = None
+                        end = None
+                        grid.reset()'''
+
+    if profiler.phases:
+        print(profiler.report())
     pygame.quit()
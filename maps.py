@@ -0,0 +1,63 @@
+# maps.py - Reading and writing grids as text files
+from utils import *
+from grid import Grid
+
+# one character per cell, one line per screen row: '#' is a barrier, anything else is free
+BARRIER_CHAR = '#'
+FREE_CHAR = '.'
+
+
+def read_map(path: str) -> tuple[int, int, bytearray]:
+    """
+    Read a map file without building any Spot objects.
+    Args:
+        path (str): The path of the map file.
+    Returns:
+        tuple[int, int, bytearray]: (rows, cols, cells), the cells being laid out like Grid.cells.
+    """
+    with open(path) as file:
+        lines = [line.rstrip('\n') for line in file if line.strip()]
+    if not lines:
+        raise ValueError(f"{path}: empty map")
+    rows, cols = max(len(line) for line in lines), len(lines)
+    cells = bytearray(rows * cols)
+    barrier = STATES['BLACK']
+    for col, line in enumerate(lines):
+        for row, char in enumerate(line):
+            if char == BARRIER_CHAR:
+                cells[col * rows + row] = barrier
+    return rows, cols, cells
+
+
+def load_map(path: str, win: "pygame.Surface" = None, width: int = GRID_WIDTH, height: int = HEIGHT) -> Grid:
+    """
+    Build a grid from a map file.
+    Args:
+        path (str): The path of the map file.
+        win (pygame.Surface): The Pygame surface (window) where the grid will be drawn, if any.
+        width (int): Width of the grid area in pixels.
+        height (int): Height of the grid area in pixels.
+    Returns:
+        Grid: The grid, with the barriers of the map.
+    """
+    rows, cols, cells = read_map(path)
+    grid = Grid(win, rows, cols, width, height)
+    barrier = STATES['BLACK']
+    grid.load_barriers([index for index, state in enumerate(cells) if state == barrier])
+    return grid
+
+
+def save_map(grid: Grid, path: str) -> None:
+    """
+    Write the barriers of a grid to a map file.
+    Args:
+        grid (Grid): The grid.
+        path (str): The path of the map file.
+    Returns:
+        None
+    """
+    barrier = STATES['BLACK']
+    with open(path, 'w') as file:
+        for col in range(grid.cols):
+            line = grid.cells[col * grid.rows:(col + 1) * grid.rows]
+            file.write(''.join(BARRIER_CHAR if state == barrier else FREE_CHAR for state in line) + '\n')
@@ -0,0 +1,411 @@
+# multi_agent.py - Paths for many agents that must not collide: cooperative A* and Conflict-Based Search
+#
+# Agents move in lockstep: at every time step each agent moves to a neighboring cell or waits.
+# Two agents collide if they are in the same cell at the same time, or if they swap cells during
+# the same step. An agent that reached its goal stays there, so nobody may go through it afterwards.
+# Paths are array('i') of the cell (see Grid.cells) of the agent at times 0, 1, 2...
+import heapq
+from array import array
+from itertools import count
+
+from utils import *
+
+BARRIER = STATES['BLACK']
+
+
+class ReservationTable:
+    def __init__(self, size: int):
+        """
+        Space-time cells and moves that an agent must avoid, hashed as plain integers:
+        the cell at time t is t * size + cell, and the move a -> b between t and t + 1 is (t * size + a) * size + b.
+        Cooperative A* reserves the paths of the agents already planned; CBS stores its constraints the same way.
+        Args:
+            size (int): Number of cells in the grid.
+        """
+        self.size: int = size
+        self.vertices: set[int] = set()
+        self.edges: set[int] = set()
+        self.parked: dict[int, int] = {}  # cell -> time from which an agent stays there forever
+        self.last: dict[int, int] = {}    # cell -> last time it is reserved, so an agent knows when it can stop there
+        self.horizon: int = 0             # last time anything is reserved
+
+    def reserve_vertex(self, cell: int, t: int) -> None:
+        """
+        Reserve a cell at a time.
+        Args:
+            cell (int): The index of the cell.
+            t (int): The time.
+        Returns:
+            None
+        """
+        self.vertices.add(t * self.size + cell)
+        if t > self.last.get(cell, -1):
+            self.last[cell] = t
+        self.horizon = max(self.horizon, t)
+
+    def reserve_edge(self, a: int, b: int, t: int) -> None:
+        """
+        Reserve the move from cell a to cell b between times t and t + 1 (so nobody moves from b to a then).
+        Args:
+            a (int): The index of the cell left.
+            b (int): The index of the cell entered.
+            t (int): The time the move starts.
+        Returns:
+            None
+        """
+        self.edges.add((t * self.size + a) * self.size + b)
+        self.horizon = max(self.horizon, t + 1)
+
+    def park(self, cell: int, t: int) -> None:
+        """
+        Reserve a cell from a time on, for an agent that stays at its goal.
+        Args:
+            cell (int): The index of the cell.
+            t (int): The time the agent arrives.
+        Returns:
+            None
+        """
+        self.parked[cell] = min(t, self.parked.get(cell, t))
+        self.horizon = max(self.horizon, t)
+
+    def reserve_path(self, path: array) -> None:
+        """
+        Reserve the cells and the moves of a path, and its last cell forever.
+        Args:
+            path (array): The cells of the path at times 0, 1, 2...
+        Returns:
+            None
+        """
+        for t, cell in enumerate(path):
+            self.reserve_vertex(cell, t)
+            if t and path[t - 1] != cell:
+                self.reserve_edge(path[t - 1], cell, t - 1)
+        self.park(path[-1], len(path) - 1)
+
+    def is_free(self, cell: int, t: int) -> bool:
+        """
+        Check if a cell can be occupied at a time.
+        Args:
+            cell (int): The index of the cell.
+            t (int): The time.
+        Returns:
+            bool: True if it is not reserved, False otherwise.
+        """
+        return t * self.size + cell not in self.vertices and self.parked.get(cell, t + 1) > t
+
+    def can_move(self, a: int, b: int, t: int) -> bool:
+        """
+        Check that moving from cell a to cell b between times t and t + 1 does not swap with a reserved move.
+        Args:
+            a (int): The index of the cell left.
+            b (int): The index of the cell entered.
+            t (int): The time the move starts.
+        Returns:
+            bool: True if nobody moves from b to a then, False otherwise.
+        """
+        return (t * self.size + b) * self.size + a not in self.edges
+
+    def can_stop(self, cell: int, t: int) -> bool:
+        """
+        Check that an agent arriving at a cell at a time can stay there forever.
+        Args:
+            cell (int): The index of the cell.
+            t (int): The time of arrival.
+        Returns:
+            bool: True if the cell is not reserved at that time or later, False otherwise.
+        """
+        return self.last.get(cell, -1) < t and cell not in self.parked
+
+
+def find_conflict(paths: list[array]) -> tuple | None:
+    """
+    Find the earliest collision between paths (agents stay at their last cell once their path ends).
+    Args:
+        paths (list[array]): The path of every agent.
+    Returns:
+        tuple | None: ('vertex', agent_a, agent_b, cell, t) for two agents in the same cell at time t,
+            ('edge', agent_a, agent_b, cell_a, cell_b, t) for agent_a moving from cell_a to cell_b while
+            agent_b moves from cell_b to cell_a between t and t + 1, or None if the paths do not collide.
+    """
+    makespan = max((len(path) for path in paths), default=0)
+    for t in range(makespan):
+        occupied = {}
+        moves = {}
+        for agent, path in enumerate(paths):
+            cell = path[min(t, len(path) - 1)]
+            other = occupied.setdefault(cell, agent)
+            if other != agent:
+                return 'vertex', other, agent, cell, t
+            if t + 1 < len(path) and path[t + 1] != cell:
+                move = (cell, path[t + 1])
+                moves[move] = agent
+                other = moves.get((move[1], move[0]))
+                if other is not None:
+                    return 'edge', agent, other, cell, path[t + 1], t
+    return None
+
+
+class MultiAgentPlanner:
+    def __init__(self, rows: int, cols: int, cells: bytearray):
+        """
+        Plan collision-free paths for several agents on a grid.
+        cooperative() plans the agents one after another around the reservations of the previous ones (fast,
+        but neither optimal nor complete); cbs() searches for the paths with the smallest sum of costs.
+        Both use space-time A*, guided by the exact distances to each goal (one BFS per goal, cached).
+        Args:
+            rows (int): Number of rows in the grid (the number of cells along the x axis).
+            cols (int): Number of columns in the grid.
+            cells (bytearray): The state of every cell, laid out like Grid.cells.
+        """
+        self.rows: int = rows
+        self.cols: int = cols
+        self.cells: bytearray = cells
+        self.size: int = rows * cols
+        self.distances: dict[int, array] = {}
+        self.expansions: int = 0  # space-time states expanded, over all the searches
+        self.nodes: int = 0       # CBS nodes expanded by the last cbs()
+
+    @classmethod
+    def from_grid(cls, grid: "Grid") -> "MultiAgentPlanner":
+        """
+        Make a planner for the barriers of a grid.
+        Args:
+            grid (Grid): The grid.
+        Returns:
+            MultiAgentPlanner: The planner.
+        """
+        return cls(grid.rows, grid.cols, grid.cells)
+
+    def _neighbors(self, index: int) -> list[int]:
+        """
+        Get the cells next to a cell that are not barriers.
+        Args:
+            index (int): The index of the cell.
+        Returns:
+            list[int]: The indices of the neighbors.
+        """
+        rows, cells = self.rows, self.cells
+        row = index % rows
+        neighbors = []
+        if row + 1 < rows:
+            neighbors.append(index + 1)
+        if row > 0:
+            neighbors.append(index - 1)
+        if index + rows < self.size:
+            neighbors.append(index + rows)
+        if index >= rows:
+            neighbors.append(index - rows)
+        return [n for n in neighbors if cells[n] != BARRIER]
+
+    def distances_to(self, goal: int) -> array:
+        """
+        Get the length of the shortest path from every cell to a goal, ignoring the other agents.
+        Args:
+            goal (int): The index of the goal cell.
+        Returns:
+            array: array('i') of the distances, -1 for the cells that cannot reach the goal.
+        """
+        distance = self.distances.get(goal)
+        if distance is None:
+            distance = self.distances[goal] = array('i', [-1]) * self.size
+            distance[goal] = 0
+            rows, size, cells = self.rows, self.size, self.cells
+            # BFS layer by layer, with the neighbor checks inlined (this runs once per goal, over the whole grid)
+            layer, d = [goal], 0
+            while layer:
+                d += 1
+                next_layer = []
+                for current in layer:
+                    row = current % rows
+                    for neighbor, inside in ((current + 1, row + 1 < rows), (current - 1, row > 0),
+                                             (current + rows, current + rows < size), (current - rows, current >= rows)):
+                        if inside and distance[neighbor] < 0 and cells[neighbor] != BARRIER:
+                            distance[neighbor] = d
+                            next_layer.append(neighbor)
+                layer = next_layer
+        return distance
+
+    def plan(self, start: int, goal: int, table: ReservationTable, max_time: int = None) -> array | None:
+        """
+        Space-time A*: the shortest path from start to goal that avoids the reservations of a table,
+        waiting in place when needed, and ends in a cell where the agent can stay forever.
+        Args:
+            start (int): The index of the start cell.
+            goal (int): The index of the goal cell.
+            table (ReservationTable): What to avoid.
+            max_time (int): The latest time the agent may arrive. No limit if None.
+        Returns:
+            array | None: The cells of the path at times 0, 1, 2..., or None if there is none.
+        """
+        distance = self.distances_to(goal)
+        if distance[start] < 0 or not table.is_free(start, 0) or goal in table.parked:
+            return None
+        size = self.size
+        # after the last reservation nothing changes with time: the states past it are one per cell,
+        # so waiting there is pointless and a search that fails cannot go on forever
+        static = table.horizon + 1
+        # the agent cannot stop at its goal before the last reservation of the goal has passed
+        earliest = table.last.get(goal, -1) + 1
+
+        counter = count()
+        # ties on f are broken towards later times, i.e. towards the goal
+        open_heap = [(max(distance[start], earliest), 0, next(counter), start)]
+        came_from = {start: None}  # space-time key -> space-time key of the previous state
+        closed = set()
+
+        while open_heap:
+            _, negative_t, _, current = heapq.heappop(open_heap)
+            if current in closed:
+                continue
+            closed.add(current)
+            self.expansions += 1
+            t, cell = -negative_t, current % size
+
+            if cell == goal and table.can_stop(cell, t):
+                path = array('i')
+                while current is not None:
+                    path.append(current % size)
+                    current = came_from[current]
+                path.reverse()
+                return path
+
+            if max_time is not None and t >= max_time:
+                continue
+            neighbors = self._neighbors(cell)
+            if t < static:
+                neighbors.append(cell)  # wait
+            for neighbor in neighbors:
+                key = min(t + 1, static) * size + neighbor
+                if key in closed or not table.is_free(neighbor, t + 1) or not table.can_move(cell, neighbor, t):
+                    continue
+                if key not in came_from:
+                    came_from[key] = current
+                    f = max(t + 1 + distance[neighbor], earliest)
+                    heapq.heappush(open_heap, (f, -(t + 1), next(counter), key))
+        return None
+
+    def _fits(self, path: array, table: ReservationTable) -> bool:
+        """
+        Check that a path planned earlier still avoids every reservation of a table.
+        Args:
+            path (array): The cells of the path at times 0, 1, 2...
+            table (ReservationTable): What to avoid.
+        Returns:
+            bool: True if the path can be kept as it is, False otherwise.
+        """
+        for t, cell in enumerate(path):
+            if not table.is_free(cell, t) or (t and not table.can_move(path[t - 1], cell, t - 1)):
+                return False
+        return table.can_stop(path[-1], len(path) - 1)
+
+    def cooperative(self, agents: list[tuple[int, int]], max_time: int = None) -> list[array | None]:
+        """
+        Cooperative A*: plan the agents in order, each one around the paths of the ones before it.
+        An agent that cannot be planned stays at its start for good: its cell is blocked for all time and
+        the agents are planned again around it (keeping the paths that did not go through it), so the
+        paths returned never collide, neither with each other nor with the agents left standing.
+        Args:
+            agents (list[tuple[int, int]]): The (start index, goal index) of every agent.
+            max_time (int): The latest time an agent may arrive; see plan().
+        Returns:
+            list[array | None]: The path of every agent, None for the agents that could not be planned
+                (they stay at their start).
+        """
+        stuck = set()
+        paths = [None] * len(agents)
+        planned = False
+        while not planned:
+            table = ReservationTable(self.size)
+            for agent, (start, _) in enumerate(agents):
+                if agent in stuck:
+                    table.park(start, 0)
+                else:
+                    table.reserve_vertex(start, 0)  # nobody walks into an agent that has not moved yet
+            planned = True
+            for agent, (start, goal) in enumerate(agents):
+                if agent in stuck:
+                    continue
+                table.vertices.discard(start)
+                path = paths[agent]
+                if path is None or not self._fits(path, table):
+                    path = self.plan(start, goal, table, max_time)
+                if path is None:
+                    # start over with this agent standing still, since the ones before it may go through its cell
+                    stuck.add(agent)
+                    planned = False
+                    break
+                table.reserve_path(path)
+                paths[agent] = path
+        return [None if agent in stuck else path for agent, path in enumerate(paths)]
+
+    def _constraint_table(self, node: tuple, agent: int) -> ReservationTable:
+        """
+        Collect the constraints of an agent along the branch of a CBS node.
+        Args:
+            node (tuple): The CBS node, (paths, constraint, parent).
+            agent (int): The agent.
+        Returns:
+            ReservationTable: The cells and moves the agent must avoid.
+        """
+        table = ReservationTable(self.size)
+        while node is not None:
+            _, constraint, node = node
+            if constraint is not None and constraint[0] == agent:
+                if constraint[1] == 'vertex':
+                    table.reserve_vertex(constraint[2], constraint[3])
+                else:
+                    # forbidding a -> b at t is reserving the opposite move b -> a
+                    table.reserve_edge(constraint[3], constraint[2], constraint[4])
+        return table
+
+    def cbs(self, agents: list[tuple[int, int]], max_nodes: int = 1000, max_time: int = None) -> list[array] | None:
+        """
+        Conflict-Based Search: plan every agent alone, then repeatedly take the cheapest set of paths,
+        find its first collision and branch on which of the two agents must avoid it.
+        The result has the smallest sum of path lengths, but the search grows quickly with the number
+        of collisions, so it gives up after `max_nodes` branches.
+        Args:
+            agents (list[tuple[int, int]]): The (start index, goal index) of every agent.
+            max_nodes (int): The largest number of CBS nodes to expand.
+            max_time (int): The latest time an agent may arrive; see plan().
+        Returns:
+            list[array] | None: The path of every agent, or None if no solution was found within `max_nodes`.
+        """
+        empty = ReservationTable(self.size)
+        paths = [self.plan(start, goal, empty, max_time) for start, goal in agents]
+        if any(path is None for path in paths):
+            return None
+
+        counter = count()
+        # a node is (paths, the constraint added by the branch, parent node); the constraints of an
+        # agent are collected from the branch when it is replanned, so nodes share their history
+        root = (paths, None, None)
+        open_heap = [(sum(len(path) - 1 for path in paths), next(counter), root)]
+        self.nodes = 0
+
+        while open_heap and self.nodes < max_nodes:
+            cost, _, node = heapq.heappop(open_heap)
+            self.nodes += 1
+            conflict = find_conflict(node[0])
+            if conflict is None:
+                return node[0]
+
+            if conflict[0] == 'vertex':
+                _, a, b, cell, t = conflict
+                branches = [(a, 'vertex', cell, t), (b, 'vertex', cell, t)]
+            else:
+                _, a, b, cell_a, cell_b, t = conflict
+                branches = [(a, 'edge', cell_a, cell_b, t), (b, 'edge', cell_b, cell_a, t)]
+
+            for constraint in branches:
+                agent = constraint[0]
+                child = (None, constraint, node)
+                start, goal = agents[agent]
+                path = self.plan(start, goal, self._constraint_table(child, agent), max_time)
+                if path is None:
+                    continue
+                paths = list(node[0])
+                child_cost = cost - (len(paths[agent]) - 1) + (len(path) - 1)
+                paths[agent] = path
+                heapq.heappush(open_heap, (child_cost, next(counter), (paths, constraint, node)))
+        return None
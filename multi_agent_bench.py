@@ -0,0 +1,107 @@
+# multi_agent_bench.py - Benchmark of the multi-agent planners (see multi_agent.py) for growing numbers of agents
+import argparse
+import random
+import time
+from array import array
+from collections import Counter
+
+from utils import *
+from components import ComponentIndex
+from maps import read_map
+from multi_agent import MultiAgentPlanner, find_conflict
+
+
+def random_cells(rows: int, cols: int, density: float, rng: random.Random) -> bytearray:
+    """
+    Make a grid with random barriers.
+    Args:
+        rows (int): Number of rows in the grid.
+        cols (int): Number of columns in the grid.
+        density (float): Probability that a cell is a barrier.
+        rng (random.Random): The random generator.
+    Returns:
+        bytearray: The cells, laid out like Grid.cells.
+    """
+    barrier = STATES['BLACK']
+    return bytearray(barrier if rng.random() < density else 0 for _ in range(rows * cols))
+
+
+def random_agents(rows: int, cols: int, cells: bytearray, count: int, rng: random.Random) -> list[tuple[int, int]]:
+    """
+    Pick distinct starts and distinct goals in the largest connected region of a grid.
+    Args:
+        rows (int): Number of rows in the grid.
+        cols (int): Number of columns in the grid.
+        cells (bytearray): The cells.
+        count (int): Number of agents.
+        rng (random.Random): The random generator.
+    Returns:
+        list[tuple[int, int]]: The (start index, goal index) of every agent.
+    """
+    components = ComponentIndex(rows, cols, cells)
+    barrier = STATES['BLACK']
+    free = [index for index, state in enumerate(cells) if state != barrier]
+    largest = Counter(components.find(components.labels[index]) for index in free).most_common(1)[0][0]
+    region = [index for index in free if components.find(components.labels[index]) == largest]
+    return list(zip(rng.sample(region, count), rng.sample(region, count)))
+
+
+def run(name: str, planner: MultiAgentPlanner, agents: list[tuple[int, int]], plan: callable) -> None:
+    """
+    Time one planner on one set of agents and print a line of results.
+    Args:
+        name (str): The name of the planner.
+        planner (MultiAgentPlanner): The planner (its distance tables are shared by the runs).
+        agents (list[tuple[int, int]]): The agents.
+        plan (callable): Called with the agents, returns their paths (None for a failure).
+    Returns:
+        None
+    """
+    planner.expansions = 0
+    t0 = time.perf_counter()
+    paths = plan(agents)
+    elapsed = (time.perf_counter() - t0) * 1000
+    solved = [path for path in (paths or []) if path is not None]
+    # the agents that could not be planned stay at their start, and must not be run into either
+    if paths and find_conflict([array('i', [start]) if path is None else path
+                                for path, (start, _) in zip(paths, agents)]) is not None:
+        raise AssertionError(f"{name}: the paths collide")
+    cost = sum(len(path) - 1 for path in solved)
+    makespan = max((len(path) - 1 for path in solved), default=0)
+    print(f"{len(agents):>6} {name:<12} {len(solved):>6} {cost:>8} {makespan:>8} {planner.expansions:>11} {elapsed:>10.1f}")
+
+
+def main(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    if args.map:
+        rows, cols, cells = read_map(args.map)
+    else:
+        rows, cols, cells = args.rows, args.cols, random_cells(args.rows, args.cols, args.density, rng)
+    planner = MultiAgentPlanner(rows, cols, cells)
+    print(f"{rows}x{cols} grid")
+    print(f"{'agents':>6} {'planner':<12} {'solved':>6} {'cost':>8} {'makespan':>8} {'expansions':>11} {'ms':>10}")
+    for count in args.agents:
+        agents = random_agents(rows, cols, cells, count, rng)
+        # the distances to the goals are computed once and shared, as a long-running planner would
+        t0 = time.perf_counter()
+        for _, goal in agents:
+            planner.distances_to(goal)
+        print(f"{count:>6} {'distances':<12} {'':>6} {'':>8} {'':>8} {'':>11} {(time.perf_counter() - t0) * 1000:>10.1f}")
+        run("cooperative", planner, agents, planner.cooperative)
+        if count <= args.cbs_max_agents:
+            run("cbs", planner, agents, lambda agents: planner.cbs(agents, args.cbs_max_nodes))
+            print(f"{'':>6} {'':<12} CBS nodes: {planner.nodes}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark of the multi-agent planners")
+    parser.add_argument("--map", default=None, help="map file to plan on, instead of a random grid")
+    parser.add_argument("--rows", type=int, default=100, help="number of rows of the random grid")
+    parser.add_argument("--cols", type=int, default=100, help="number of columns of the random grid")
+    parser.add_argument("--density", type=float, default=0.15, help="fraction of barriers in the random grid")
+    parser.add_argument("--agents", type=lambda text: [int(n) for n in text.split(',')],
+                        default=[10, 20, 50, 100, 200, 500], help="comma separated numbers of agents")
+    parser.add_argument("--cbs-max-agents", type=int, default=50, help="run CBS only up to this many agents")
+    parser.add_argument("--cbs-max-nodes", type=int, default=500, help="CBS gives up after this many nodes")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,103 @@
+# paths.py - Parent pointers stored as one byte per cell, and compact paths
+from array import array
+
+# run-length encoded moves use one letter per direction, as seen on the screen
+MOVE_NAMES = {1: 'R', -1: 'L'}  # the vertical moves depend on the width of the grid, see ParentMap
+
+
+class ParentMap:
+    def __init__(self, rows: int, cols: int):
+        """
+        The parent of every cell of a search tree, stored as a direction code in a byte array
+        (0: no parent, 1-4: the parent is the right, left, lower or upper neighbor) instead of a
+        dictionary of Spot to Spot. The array is allocated once per grid and cleared before each search.
+        After a search succeeds, path() gives the path as an array of cell indices.
+        Args:
+            rows (int): Number of rows in the grid (the number of cells along the x axis).
+            cols (int): Number of columns in the grid.
+        """
+        self.rows: int = rows
+        self.cols: int = cols
+        self.codes: bytearray = bytearray(rows * cols)
+        # the index offset of the parent for each code, and the code for each offset
+        self.offsets: tuple = (0, 1, -1, rows, -rows)
+        self.code_of: dict[int, int] = {offset: code for code, offset in enumerate(self.offsets) if code}
+
+    def clear(self) -> None:
+        """
+        Forget all the parents.
+        Returns:
+            None
+        """
+        self.codes[:] = bytes(len(self.codes))
+
+    def set(self, index: int, parent: int) -> None:
+        """
+        Record the parent of a cell.
+        Args:
+            index (int): The index of the cell.
+            parent (int): The index of its parent, a neighbor of the cell.
+        Returns:
+            None
+        """
+        self.codes[index] = self.code_of[parent - index]
+
+    def load(self, path) -> None:
+        """
+        Replace the parents with those of a single path.
+        Args:
+            path: The cell indices of the path, from start to end.
+        Returns:
+            None
+        """
+        self.clear()
+        for parent, index in zip(path, path[1:]):
+            self.set(index, parent)
+
+    def get(self, index: int) -> int | None:
+        """
+        Get the parent of a cell.
+        Args:
+            index (int): The index of the cell.
+        Returns:
+            int | None: The index of its parent, or None if it has none.
+        """
+        code = self.codes[index]
+        return index + self.offsets[code] if code else None
+
+    def path(self, end: int) -> array:
+        """
+        Follow the parents from a cell back to the root of the search (the start).
+        Only meaningful for a cell the last search reached: a cell without a parent is taken to be
+        the start itself, so the path to it is the cell alone (e.g. when the start is also the end).
+        Args:
+            end (int): The index of the last cell of the path.
+        Returns:
+            array: array('i') of the cell indices from start to end.
+        """
+        codes, offsets = self.codes, self.offsets
+        path = array('i', [end])
+        current = end
+        while codes[current]:
+            current += offsets[codes[current]]
+            path.append(current)
+        path.reverse()
+        return path
+
+    def run_length(self, path: array) -> list[tuple[str, int]]:
+        """
+        Encode a path as runs of moves, e.g. [('R', 4), ('D', 2)]: 4 cells right then 2 down.
+        Args:
+            path (array): The cell indices of the path.
+        Returns:
+            list[tuple[str, int]]: The (direction, count) runs.
+        """
+        names = {**MOVE_NAMES, self.rows: 'D', -self.rows: 'U'}
+        runs = []
+        for a, b in zip(path, path[1:]):
+            move = names[b - a]
+            if runs and runs[-1][0] == move:
+                runs[-1] = (move, runs[-1][1] + 1)
+            else:
+                runs.append((move, 1))
+        return runs
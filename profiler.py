@@ -0,0 +1,175 @@
+# profiler.py - Frame timing and search profiling helpers
+import cProfile
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from utils import *
+
+OVERLAY_REFRESH_MS = 250  # how often the numbers of the overlay change, so its lines are rendered once per refresh
+
+
+class RingHistogram:
+    def __init__(self, size: int = 240):
+        """
+        Keep the last `size` samples of a measurement and answer percentile queries over them.
+        Args:
+            size (int): How many samples the ring buffer holds before the oldest ones are dropped.
+        """
+        self.samples: deque = deque(maxlen=size)
+
+    def add(self, value: float) -> None:
+        """
+        Record one sample, dropping the oldest one if the buffer is full.
+        Args:
+            value (float): The measured value.
+        Returns:
+            None
+        """
+        self.samples.append(value)
+
+    def percentile(self, p: float) -> float:
+        """
+        Get the p-th percentile (nearest rank) of the samples in the buffer.
+        Args:
+            p (float): The percentile, between 0 and 100.
+        Returns:
+            float: The percentile value, or 0.0 if no samples were recorded.
+        """
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        rank = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+        return ordered[rank]
+
+    def summary(self) -> dict:
+        """
+        Get the p50/p95/p99 values of the samples in the buffer.
+        Returns:
+            dict: A dictionary with the keys 'p50', 'p95', 'p99' and 'count'.
+        """
+        return {
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'count': len(self.samples),
+        }
+
+
+class FrameProfiler:
+    def __init__(self, enabled: bool = False, size: int = 240):
+        """
+        Record how long each phase of a frame takes, in milliseconds.
+        Args:
+            enabled (bool): Whether timings are recorded (and the overlay is shown) from the start.
+            size (int): How many frames each phase histogram keeps.
+        """
+        self.enabled: bool = enabled
+        self.size: int = size
+        self.phases: dict[str, RingHistogram] = {}
+        self.frame_start: float | None = None
+        self.overlay_lines: list[str] = []
+        self.overlay_time: float = 0.0
+
+    def toggle(self) -> None:
+        """
+        Turn recording and the overlay on or off.
+        Returns:
+            None
+        """
+        self.enabled = not self.enabled
+        self.frame_start = None
+
+    def _record(self, name: str, elapsed_ms: float) -> None:
+        if name not in self.phases:
+            self.phases[name] = RingHistogram(self.size)
+        self.phases[name].add(elapsed_ms)
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Time the code inside the `with` block as the phase `name` of the current frame.
+        Args:
+            name (str): The name of the phase (e.g. 'events', 'display').
+        """
+        if not self.enabled:
+            yield
+            return
+        if self.frame_start is None:
+            self.frame_start = time.perf_counter()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, (time.perf_counter() - t0) * 1000)
+
+    def end_frame(self) -> None:
+        """
+        Close the current frame and record its total duration as the 'frame' phase.
+        Returns:
+            None
+        """
+        if not self.enabled or self.frame_start is None:
+            return
+        self._record('frame', (time.perf_counter() - self.frame_start) * 1000)
+        self.frame_start = None
+
+    def report(self) -> str:
+        """
+        Format the p50/p95/p99 of every phase as a small text table.
+        Returns:
+            str: One line per phase.
+        """
+        lines = [f"{'phase':<12}{'p50':>8}{'p95':>8}{'p99':>8}   (ms)"]
+        for name, histogram in self.phases.items():
+            s = histogram.summary()
+            lines.append(f"{name:<12}{s['p50']:>8.2f}{s['p95']:>8.2f}{s['p99']:>8.2f}")
+        return "\n".join(lines)
+
+    def draw_overlay(self, win: "pygame.Surface", font: "pygame.font.Font") -> None:
+        """
+        Draw the timing table in the top left corner of the window.
+        Args:
+            win (pygame.Surface): The Pygame surface (window) where the overlay will be drawn.
+            font (pygame.font.Font): The font used for the table.
+        Returns:
+            None
+        """
+        if not self.enabled:
+            return
+        import pygame
+        from ui import render_text
+        now = time.perf_counter()
+        if not self.overlay_lines or (now - self.overlay_time) * 1000 >= OVERLAY_REFRESH_MS:
+            self.overlay_lines = self.report().split("\n")
+            self.overlay_time = now
+        lines = self.overlay_lines
+        line_height = font.get_linesize()
+        overlay = pygame.Surface((300, line_height * len(lines) + 10), pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 180))
+        for i, line in enumerate(lines):
+            overlay.blit(render_text(font, line, COLORS['TEXT']), (5, 5 + i * line_height))
+        win.blit(overlay, (0, 0))
+
+
+def profile_search(algorithm: callable, out_dir: str, name: str, *args) -> bool:
+    """
+    Run a search algorithm under cProfile and dump the stats to `out_dir`.
+    The dump can be inspected with `python -m pstats <file>` or snakeviz.
+    Args:
+        algorithm (callable): The search function to run.
+        out_dir (str): The directory where the .prof file is written.
+        name (str): The name of the algorithm, used in the file name.
+        *args: The arguments passed to the algorithm.
+    Returns:
+        bool: Whatever the algorithm returned.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    profile = cProfile.Profile()
+    result = profile.runcall(algorithm, *args)
+    safe_name = "".join(c if c.isalnum() else "_" for c in name)
+    path = os.path.join(out_dir, f"{safe_name}-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+    profile.dump_stats(path)
+    print(f"Search profile written to {path}")
+    return result
@@ -0,0 +1,209 @@
+# renderer.py - Draws the grid from its cells array with a few blits
+import math
+import time
+
+import pygame
+
+from utils import *
+
+MIN_LINE_SCALE = 4      # pixels per cell below which the grid lines are not drawn
+MIP_REFRESH_MS = 250    # how often the zoomed out (mipmapped) view follows the changes of the cells
+OVERLAY_ALPHA = 200     # opacity of overlays such as the distance heatmap
+MIN_ARROW_SCALE = 8     # pixels per cell below which the arrows of a flow field are not drawn
+MIP_LEVELS = 6          # enough levels for the smallest zoom of the viewport (1/64 pixels per cell)
+
+
+class GridRenderer:
+    def __init__(self, grid: "Grid"):
+        """
+        Render a grid through a palette-indexed surface that shares its memory with `grid.cells`.
+        Instead of one pygame.draw.rect per spot, a frame scales the visible part of the small cells
+        surface to the window and blits the (cached) grid lines, so its cost does not depend on the grid size.
+        Args:
+            grid (Grid): The grid to render.
+        """
+        self.grid = grid
+        # one pixel per cell; the surface reads the bytes of grid.cells directly, so it is never out of date
+        self.cells_surface: pygame.Surface = pygame.image.frombuffer(grid.cells, (grid.rows, grid.cols), 'P')
+        self.cells_surface.set_palette(PALETTE)
+        self.scaled_surface: pygame.Surface | None = None
+        self.lines_surface: pygame.Surface | None = None
+        self.lines_key: tuple | None = None
+        # level of detail for zoomed out views: level i averages blocks of 2^i x 2^i cells
+        self.mip_levels: list[pygame.Surface] = []
+        self.mip_snapshot: bytes | None = None
+        self.mip_time: float = 0.0
+        self.overlay: pygame.Surface | None = None
+        self.flow_field = None
+        self.arrows_surface: pygame.Surface | None = None
+        self.arrows_key: tuple | None = None
+
+    def _mip_level(self, level: int) -> pygame.Surface:
+        """
+        Get a downsampled copy of the cells, rebuilding the mip chain if the cells changed
+        (at most once every MIP_REFRESH_MS, so a running search does not rebuild it every frame).
+        Args:
+            level (int): The level of detail, 1 or more.
+        Returns:
+            pygame.Surface: A 32-bit surface where each pixel is the average color of 2^level x 2^level cells.
+        """
+        assert level >= 1, "level 0 is the cells surface itself"
+        now = time.perf_counter()
+        stale = self.mip_snapshot is None or (
+            (now - self.mip_time) * 1000 >= MIP_REFRESH_MS and self.grid.cells != self.mip_snapshot)
+        if stale:
+            self.mip_snapshot = bytes(self.grid.cells)
+            self.mip_time = now
+            source = pygame.Surface(self.cells_surface.get_size(), 0, 32)
+            source.blit(self.cells_surface, (0, 0))
+            self.mip_levels = []
+            for _ in range(MIP_LEVELS):
+                width, height = source.get_size()
+                if width == 1 and height == 1:
+                    break
+                source = pygame.transform.smoothscale(source, (max(1, width // 2), max(1, height // 2)))
+                self.mip_levels.append(source)
+        return self.mip_levels[min(level, len(self.mip_levels)) - 1]
+
+    def _lines(self) -> pygame.Surface | None:
+        """
+        Get the grid lines of the current view, drawn on a transparent surface that is only redrawn when the view moves.
+        Returns:
+            pygame.Surface | None: The lines surface, or None if the cells are too small to show lines.
+        """
+        viewport = self.grid.viewport
+        if viewport.scale < MIN_LINE_SCALE:
+            return None
+        key = (viewport.scale, viewport.offset_x, viewport.offset_y)
+        if self.lines_surface is None:
+            # lines run up to (width, height) inclusive, hence the extra pixel
+            self.lines_surface = pygame.Surface((self.grid.width + 1, self.grid.height + 1))
+            self.lines_surface.set_colorkey(COLORS['BACKGROUND'])
+        if key != self.lines_key:
+            self.lines_key = key
+            self.lines_surface.fill(COLORS['BACKGROUND'])
+            self.grid.draw_grid_lines(self.lines_surface)
+        return self.lines_surface
+
+    def _blit_visible(self, win: pygame.Surface, source: pygame.Surface) -> None:
+        """
+        Scale the part of a cells-sized surface (or of one of its mip levels) that is in view to the window.
+        Args:
+            win (pygame.Surface): The Pygame surface (window) where the cells will be drawn.
+            source (pygame.Surface): A surface with one pixel per cell, or per block of cells.
+        Returns:
+            None
+        """
+        viewport = self.grid.viewport
+        row_start, col_start, row_end, col_end = viewport.visible_cells()
+        if row_end <= row_start or col_end <= col_start:
+            return
+
+        # source pixels per cell along each axis (1 for the cells surface, less for the mip levels)
+        fx = source.get_width() / self.grid.rows
+        fy = source.get_height() / self.grid.cols
+        x0, y0 = math.floor(row_start * fx), math.floor(col_start * fy)
+        x1 = min(source.get_width(), math.ceil(row_end * fx))
+        y1 = min(source.get_height(), math.ceil(col_end * fy))
+        visible = source.subsurface((x0, y0, x1 - x0, y1 - y0))
+
+        left, top = viewport.cell_to_screen(x0 / fx, y0 / fy)
+        right, bottom = viewport.cell_to_screen(x1 / fx, y1 / fy)
+        left, top, right, bottom = round(left), round(top), round(right), round(bottom)
+        size = (max(1, right - left), max(1, bottom - top))
+
+        if source is self.cells_surface:
+            # scale into a reused 8-bit surface, the palette is applied by the final blit
+            if self.scaled_surface is None or self.scaled_surface.get_size() != size:
+                self.scaled_surface = pygame.Surface(size, 0, self.cells_surface)
+                self.scaled_surface.set_palette(PALETTE)
+            pygame.transform.scale(visible, size, self.scaled_surface)
+            win.blit(self.scaled_surface, (left, top))
+        else:
+            win.blit(pygame.transform.scale(visible, size), (left, top))
+
+    def set_overlay(self, rgb) -> None:
+        """
+        Show an image with one pixel per cell (e.g. a distance heatmap) on top of the spots, or remove it.
+        Args:
+            rgb (np.ndarray | None): A (cols, rows, 3) array of colors, indexed like the cells; None removes the overlay.
+        Returns:
+            None
+        """
+        if rgb is None:
+            self.overlay = None
+            return
+        # surfarray arrays are indexed (x, y), the cells (y, x)
+        self.overlay = pygame.surfarray.make_surface(rgb.swapaxes(0, 1))
+        self.overlay.set_alpha(OVERLAY_ALPHA)
+
+    def set_flow_field(self, field) -> None:
+        """
+        Show the directions of a flow field as arrows, or remove them.
+        Args:
+            field (FlowField | None): The flow field; None removes the arrows.
+        Returns:
+            None
+        """
+        self.flow_field = field
+        self.arrows_key = None
+
+    def _arrows(self) -> pygame.Surface | None:
+        """
+        Get the arrows of the flow field for the visible cells, redrawn only when the view or the field changes.
+        Returns:
+            pygame.Surface | None: The arrows surface, or None if there is no flow field or the cells are too small.
+        """
+        viewport = self.grid.viewport
+        if self.flow_field is None or viewport.scale < MIN_ARROW_SCALE:
+            return None
+        key = (id(self.flow_field), viewport.scale, viewport.offset_x, viewport.offset_y)
+        if self.arrows_surface is None:
+            self.arrows_surface = pygame.Surface((self.grid.width, self.grid.height))
+            self.arrows_surface.set_colorkey(COLORS['BACKGROUND'])
+        if key != self.arrows_key:
+            self.arrows_key = key
+            self.arrows_surface.fill(COLORS['BACKGROUND'])
+            half = viewport.scale / 2
+            row_start, col_start, row_end, col_end = viewport.visible_cells()
+            for col in range(col_start, col_end):
+                for row in range(row_start, row_end):
+                    direction = self.flow_field.direction(col * self.grid.rows + row)
+                    if direction is None:
+                        continue
+                    dx, dy = direction
+                    x, y = viewport.cell_to_screen(row, col)
+                    cx, cy = x + half, y + half
+                    # a triangle pointing from the center of the cell towards the next one
+                    tip = (cx + dx * half * 0.8, cy + dy * half * 0.8)
+                    left = (cx - dx * half * 0.4 - dy * half * 0.4, cy - dy * half * 0.4 - dx * half * 0.4)
+                    right = (cx - dx * half * 0.4 + dy * half * 0.4, cy - dy * half * 0.4 + dx * half * 0.4)
+                    pygame.draw.polygon(self.arrows_surface, COLORS['TURQUOISE'], (tip, left, right))
+        return self.arrows_surface
+
+    def draw(self, win: pygame.Surface) -> None:
+        """
+        Draw the visible spots and the grid lines on the given surface, clipped to the grid area.
+        Args:
+            win (pygame.Surface): The Pygame surface (window) where the grid will be drawn.
+        Returns:
+            None
+        """
+        clip = win.get_clip()
+        win.set_clip(pygame.Rect(0, 0, self.grid.width, self.grid.height).clip(clip))
+        scale = self.grid.viewport.scale
+        # below 1:1 the level is how many times the cells are halved; zooms down to 1/2 still use the cells
+        level = 0 if scale >= 1 else int(math.log2(1 / scale))
+        self._blit_visible(win, self.cells_surface if level == 0 else self._mip_level(level))
+        if self.overlay is not None:
+            self._blit_visible(win, self.overlay)
+        arrows = self._arrows()
+        if arrows is not None:
+            win.blit(arrows, (0, 0))
+        win.set_clip(clip)
+
+        lines = self._lines()
+        if lines is not None:
+            win.set_clip(pygame.Rect(0, 0, self.grid.width + 1, self.grid.height + 1).clip(clip))
+            win.blit(lines, (0, 0))
+            win.set_clip(clip)
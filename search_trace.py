@@ -0,0 +1,387 @@
+# search_trace.py - Recording searches as compact binary event logs, and replaying them without rerunning the search
+#
+# A trace is the state of the cells when the search started, followed by one event per state change:
+# (step, cell, state), the step being the number of draw() calls made by the search before the change.
+# On disk the events are delta encoded: varint((step - previous step) << 3 | state) then the zigzag
+# varint of (cell - previous cell), so a search spreading through neighboring cells costs 2-3 bytes per event.
+# The payload after the 6-byte header can be compressed with zlib.
+import bisect
+import os
+import zlib
+from array import array
+
+from utils import *
+
+MAGIC = b'PTRC'
+VERSION = 1
+FLAG_COMPRESSED = 1
+STATE_BITS = 3          # every state (see STATE_NAMES) fits in 3 bits
+KEYFRAME_EVERY = 4096   # fewest events between two stored copies of the cells, used to scrub backwards
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    """
+    Append a non-negative integer as a LEB128 varint (7 bits per byte, high bit set on all but the last byte).
+    Args:
+        out (bytearray): Where to write.
+        value (int): The integer.
+    Returns:
+        None
+    """
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> tuple[int, int]:
+    """
+    Read a LEB128 varint.
+    Args:
+        data (bytes): The encoded data.
+        pos (int): Where the varint starts.
+    Returns:
+        tuple[int, int]: (value, position after the varint).
+    """
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class TraceRecorder:
+    def __init__(self, rows: int, cols: int, cells: bytearray):
+        """
+        Collect the state changes of a search. Set it as the `trace` of a grid: every Spot of the grid
+        then reports its state changes with record(), and the draw callback wrapped by wrap() counts the steps.
+        Args:
+            rows (int): Number of rows in the grid.
+            cols (int): Number of columns in the grid.
+            cells (bytearray): The cells of the grid (see Grid.cells), copied as the first frame.
+        """
+        self.rows: int = rows
+        self.cols: int = cols
+        self.initial: bytes = bytes(cells)
+        self.events: bytearray = bytearray()  # encoded as they come, see the top of the file
+        self.count: int = 0
+        self.step: int = 0
+        self.last_step: int = 0
+        self.last_cell: int = 0
+
+    def record(self, index: int, state: int) -> None:
+        """
+        Record a state change of a cell at the current step.
+        Args:
+            index (int): The index of the cell.
+            state (int): Its new state (see STATES).
+        Returns:
+            None
+        """
+        events = self.events
+        _write_varint(events, (self.step - self.last_step) << STATE_BITS | state)
+        delta = index - self.last_cell
+        _write_varint(events, delta << 1 if delta >= 0 else (-delta << 1) - 1)
+        self.last_step = self.step
+        self.last_cell = index
+        self.count += 1
+
+    def wrap(self, draw: callable) -> callable:
+        """
+        Wrap the draw callback of a search so that every call starts a new step of the trace.
+        Args:
+            draw (callable): The draw callback.
+        Returns:
+            callable: The callback to give to the search instead.
+        """
+        def step() -> None:
+            self.step += 1
+            draw()
+        return step
+
+    def to_bytes(self, compress: bool = True) -> bytes:
+        """
+        Encode the trace.
+        Args:
+            compress (bool): Whether to compress the payload with zlib.
+        Returns:
+            bytes: The trace file contents.
+        """
+        payload = bytearray()
+        for value in (self.rows, self.cols, self.step, self.count):
+            _write_varint(payload, value)
+        payload += self.initial
+        payload += self.events
+        if compress:
+            payload = zlib.compress(payload)
+        return MAGIC + bytes((VERSION, FLAG_COMPRESSED if compress else 0)) + payload
+
+    def save(self, path: str, compress: bool = True) -> None:
+        """
+        Write the trace to a file.
+        Args:
+            path (str): The path of the file.
+            compress (bool): Whether to compress the payload with zlib.
+        Returns:
+            None
+        """
+        with open(path, 'wb') as file:
+            file.write(self.to_bytes(compress))
+
+
+class Trace:
+    def __init__(self, rows: int, cols: int, frames: int, initial: bytes, steps: array, cells: array, states: bytearray):
+        """
+        A decoded trace. Use Trace.load() or Trace.from_bytes() to make one.
+        Args:
+            rows (int): Number of rows in the grid.
+            cols (int): Number of columns in the grid.
+            frames (int): Number of steps (draw() calls) of the search.
+            initial (bytes): The cells when the search started.
+            steps (array): array('i') of the step of every event, in order.
+            cells (array): array('i') of the cell of every event.
+            states (bytearray): The new state of every event.
+        """
+        self.rows: int = rows
+        self.cols: int = cols
+        self.frames: int = frames
+        self.initial: bytes = initial
+        self.steps: array = steps
+        self.cells: array = cells
+        self.states: bytearray = states
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Trace":
+        """
+        Decode a trace.
+        Args:
+            data (bytes): The trace file contents.
+        Returns:
+            Trace: The trace.
+        """
+        if data[:4] != MAGIC or data[4] != VERSION:
+            raise ValueError("not a search trace (or one written by another version)")
+        payload = zlib.decompress(data[6:]) if data[5] & FLAG_COMPRESSED else data[6:]
+        pos = 0
+        rows, pos = _read_varint(payload, pos)
+        cols, pos = _read_varint(payload, pos)
+        frames, pos = _read_varint(payload, pos)
+        count, pos = _read_varint(payload, pos)
+        initial = bytes(payload[pos:pos + rows * cols])
+        pos += rows * cols
+
+        steps, cells, states = array('i', bytes(4 * count)), array('i', bytes(4 * count)), bytearray(count)
+        mask = (1 << STATE_BITS) - 1
+        step = cell = 0
+        for i in range(count):
+            value, pos = _read_varint(payload, pos)
+            step += value >> STATE_BITS
+            states[i] = value & mask
+            value, pos = _read_varint(payload, pos)
+            cell += -((value + 1) >> 1) if value & 1 else value >> 1
+            steps[i] = step
+            cells[i] = cell
+        return cls(rows, cols, frames, initial, steps, cells, states)
+
+    @classmethod
+    def load(cls, path: str) -> "Trace":
+        """
+        Read a trace file.
+        Args:
+            path (str): The path of the file.
+        Returns:
+            Trace: The trace.
+        """
+        with open(path, 'rb') as file:
+            return cls.from_bytes(file.read())
+
+
+class TracePlayer:
+    def __init__(self, trace: Trace, cells: bytearray = None):
+        """
+        Replay a trace into a cells array, frame by frame or jumping to any frame.
+        Frame n shows the cells after every event of steps 0..n; frame `trace.frames` is the end of the search.
+        Args:
+            trace (Trace): The trace.
+            cells (bytearray): Where to replay it, e.g. the cells of a Grid of the same size (so its renderer shows it).
+                A new array if None.
+        """
+        if cells is None:
+            cells = bytearray(len(trace.initial))
+        self.trace: Trace = trace
+        self.cells: bytearray = cells
+        self.cells[:] = trace.initial
+        self.position: int = 0  # number of events applied
+        self.frame: int = 0
+        # copies of the cells every `keyframe_every` events, so seeking backwards does not start over;
+        # spaced so that they take at most about four bytes per event
+        self.keyframe_every: int = max(KEYFRAME_EVERY, len(trace.initial) // 4)
+        self.keyframes: list[bytes] = [trace.initial]
+        for end in range(self.keyframe_every, len(trace.steps) + 1, self.keyframe_every):
+            self._apply(end)
+            self.keyframes.append(bytes(self.cells))
+        self.seek(0)
+
+    def _apply(self, end: int) -> None:
+        """
+        Apply the events from the current position up to (but not including) event `end`.
+        Args:
+            end (int): The index of the first event not to apply.
+        Returns:
+            None
+        """
+        cells, states, cell_of = self.cells, self.trace.states, self.trace.cells
+        for i in range(self.position, end):
+            cells[cell_of[i]] = states[i]
+        self.position = end
+
+    def seek(self, frame: int) -> None:
+        """
+        Show a frame.
+        Args:
+            frame (int): The frame, clamped to 0..trace.frames.
+        Returns:
+            None
+        """
+        frame = max(0, min(frame, self.trace.frames))
+        end = bisect.bisect_right(self.trace.steps, frame)
+        if end < self.position:
+            keyframe = end // self.keyframe_every
+            self.cells[:] = self.keyframes[keyframe]
+            self.position = keyframe * self.keyframe_every
+        self._apply(end)
+        self.frame = frame
+
+    def at_end(self) -> bool:
+        """
+        Check if the last frame is shown.
+        Returns:
+            bool: True if the replay is over, False otherwise.
+        """
+        return self.frame >= self.trace.frames
+
+
+def record_search(algorithm: callable, out_path: str, draw: callable, grid: "Grid", *args, compress: bool = True) -> bool:
+    """
+    Run a search algorithm while recording its trace, and write the trace to a file.
+    Args:
+        algorithm (callable): The search function to run.
+        out_path (str): The path of the trace file.
+        draw (callable): The draw callback of the search.
+        grid (Grid): The grid searched.
+        *args: The other arguments of the algorithm (start, end and the optional parameter).
+        compress (bool): Whether to compress the trace with zlib.
+    Returns:
+        bool: Whatever the algorithm returned.
+    """
+    recorder = TraceRecorder(grid.rows, grid.cols, grid.cells)
+    grid.trace = recorder
+    try:
+        result = algorithm(recorder.wrap(draw), grid, *args)
+    finally:
+        grid.trace = None
+    recorder.save(out_path, compress)
+    print(f"Search trace written to {out_path} ({recorder.count} events, {recorder.step} steps)")
+    return result
+
+
+def export_csv(trace: Trace, path: str) -> None:
+    """
+    Write the events of a trace as CSV (step, row, col, state).
+    Args:
+        trace (Trace): The trace.
+        path (str): The path of the CSV file.
+    Returns:
+        None
+    """
+    with open(path, 'w') as file:
+        file.write("step,row,col,state\n")
+        for step, cell, state in zip(trace.steps, trace.cells, trace.states):
+            file.write(f"{step},{cell % trace.rows},{cell // trace.rows},{STATE_NAMES[state]}\n")
+
+
+def export_frames(trace: Trace, out_dir: str, every: int = 1, scale: int = 1) -> int:
+    """
+    Write frames of a trace as PNG images, one pixel (times `scale`) per cell.
+    Args:
+        trace (Trace): The trace.
+        out_dir (str): The directory of the images.
+        every (int): Write one frame out of `every`; the last frame is always written.
+        scale (int): Size of a cell in pixels.
+    Returns:
+        int: The number of images written.
+    """
+    import pygame
+    os.makedirs(out_dir, exist_ok=True)
+    player = TracePlayer(trace)
+    surface = pygame.image.frombuffer(player.cells, (trace.rows, trace.cols), 'P')
+    surface.set_palette(PALETTE)
+    frames = sorted(set(range(0, trace.frames, every)) | {trace.frames})
+    for frame in frames:
+        player.seek(frame)
+        image = surface if scale == 1 else pygame.transform.scale(surface, (trace.rows * scale, trace.cols * scale))
+        pygame.image.save(image, os.path.join(out_dir, f"frame-{frame:06d}.png"))
+    return len(frames)
+
+
+def _record_main(args: "argparse.Namespace") -> None:
+    import searching_algorithms
+    from maps import load_map
+
+    algorithm = getattr(searching_algorithms, args.algorithm, None)
+    if not callable(algorithm):
+        raise SystemExit(f"unknown algorithm {args.algorithm!r}")
+    grid = load_map(args.map)
+    start, end = grid.grid[args.start[0]][args.start[1]], grid.grid[args.end[0]][args.end[1]]
+    if start.is_barrier() or end.is_barrier():
+        raise SystemExit("the start and the end must not be barriers")
+    start.make_start()
+    end.make_end()
+    for row in grid.grid:
+        for spot in row:
+            spot.update_neighbors(grid.grid)
+    extra = () if args.param is None else (float(args.param) if '.' in args.param else int(args.param),)
+    found = record_search(algorithm, args.out, lambda: None, grid, start, end, *extra, compress=not args.no_compress)
+    print("Path found" if found else "No path")
+
+
+def _export_main(args: "argparse.Namespace") -> None:
+    trace = Trace.load(args.trace)
+    print(f"{trace.rows}x{trace.cols} grid, {len(trace.steps)} events, {trace.frames} steps")
+    if args.csv:
+        export_csv(trace, args.csv)
+        print(f"Events written to {args.csv}")
+    if args.frames:
+        count = export_frames(trace, args.frames, args.every, args.scale)
+        print(f"{count} frames written to {args.frames}")
+
+
+if __name__ == "__main__":
+    import argparse  # only for the command line: importing the module stays cheap
+
+    parser = argparse.ArgumentParser(description="Record search traces headlessly, or export them")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="run a search on a map file and record its trace")
+    record.add_argument("--map", required=True, help="map file ('#' for barriers, one line per screen row)")
+    record.add_argument("--algorithm", default="astar", help="name of a function of searching_algorithms, e.g. bfs")
+    record.add_argument("--param", default=None, help="extra parameter of the algorithm (depth limit, epsilon...)")
+    record.add_argument("--start", type=int, nargs=2, required=True, metavar=("ROW", "COL"))
+    record.add_argument("--end", type=int, nargs=2, required=True, metavar=("ROW", "COL"))
+    record.add_argument("--out", required=True, help="path of the trace file")
+    record.add_argument("--no-compress", action="store_true", help="do not compress the trace with zlib")
+    record.set_defaults(run=_record_main)
+
+    export = commands.add_parser("export", help="export a trace as CSV events and/or PNG frames")
+    export.add_argument("trace", help="path of the trace file")
+    export.add_argument("--csv", default=None, help="write the events to this CSV file")
+    export.add_argument("--frames", default=None, metavar="DIR", help="write PNG frames to this directory")
+    export.add_argument("--every", type=int, default=1, help="write one frame out of EVERY")
+    export.add_argument("--scale", type=int, default=1, help="size of a cell in pixels in the frames")
+    export.set_defaults(run=_export_main)
+
+    args = parser.parse_args()
+    args.run(args)
@@ -3,9 +3,44 @@ from operator import truediv
 
 from utils import *
 from collections import deque
+import heapq
+import time
 from queue import PriorityQueue
 from grid import Grid
 from spot import Spot
+from bitboard import Bitboard
+
+
+def spot_at(grid: Grid, index: int) -> Spot:
+    """
+    Get the spot of a cell index (see Grid.cells).
+    Args:
+        grid (Grid): The Grid object containing the spots.
+        index (int): The index of the cell.
+    Returns:
+        Spot: The spot.
+    """
+    return grid.grid[index % grid.rows][index // grid.rows]
+
+
+def show_path(draw: callable, grid: Grid, start: Spot, end: Spot) -> bool:
+    """
+    Mark the path recorded in grid.parents by the last search, and draw it once.
+    The path itself, as cell indices, is returned by grid.parents.path(end.index).
+    Args:
+        draw (callable): A function to call to update the Pygame window.
+        grid (Grid): The Grid object containing the spots.
+        start (Spot): The starting spot.
+        end (Spot): The ending spot.
+    Returns:
+        bool: True, so that a search can return show_path(...) when it reaches the end.
+    """
+    for index in grid.parents.path(end.index)[1:-1]:
+        spot_at(grid, index).make_path()
+    end.make_end()
+    start.make_start()
+    draw()
+    return True
 
 def bfs(draw: callable, grid: Grid, start: Spot, end: Spot) -> bool:
     """
@@ -18,32 +53,26 @@ def bfs(draw: callable, grid: Grid, start: Spot, end: Spot) -> bool:
     Returns:
         bool: True if a path is found, False otherwise.
     """
+    # cells in different connected components: do not flood the whole region to find out
+    if not grid.connected(start, end):
+        return False
 
     queue = deque()
     queue.append(start)
     visited = {start}
-    path = {}
+    parents = grid.parents
+    parents.clear()
 
     while queue:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-
         current = queue.popleft()
 
         if current == end:
-            while current in path:
-                current = path[current]
-                current.make_path()
-                draw()
-            end.make_end()
-            start.make_start()
-            return True
+            return show_path(draw, grid, start, end)
 
         for neighbor in current.neighbors:
             if neighbor not in visited and not neighbor.is_barrier():
                 visited.add(neighbor)
-                path[neighbor] = current
+                parents.set(neighbor.index, current.index)
                 queue.append(neighbor)
                 neighbor.make_open()
 
@@ -55,6 +84,29 @@ def bfs(draw: callable, grid: Grid, start: Spot, end: Spot) -> bool:
     return False
 
 
+def bfs_bitboard(draw: callable, grid: Grid, start: Spot, end: Spot) -> bool:
+    """
+    Breadth-First Search (BFS) over bitboards: expands a whole wavefront per step instead of one spot.
+    Only the path is drawn, since marking every visited spot would cost as much as the object-based BFS.
+    Args:
+        draw (callable): A function to call to update the Pygame window (once per wavefront).
+        grid (Grid): The Grid object containing the spots.
+        start (Spot): The starting spot.
+        end (Spot): The ending spot.
+    Returns:
+        bool: True if a path is found, False otherwise.
+    """
+    if not grid.connected(start, end):
+        return False
+
+    path = Bitboard.from_grid(grid).shortest_path(start.index, end.index, draw)
+    if path is None:
+        return False
+
+    grid.parents.load(path)
+    return show_path(draw, grid, start, end)
+
+
 def dfs(draw: callable, grid: Grid, start: Spot, end: Spot) -> bool:
     """
     Depdth-First Search (DFS) Algorithm.
@@ -70,30 +122,24 @@ def dfs(draw: callable, grid: Grid, start: Spot, end: Spot) -> bool:
     if start is None or end is None:
         return False
 
+    if not grid.connected(start, end):
+        return False
+
     stack = [start]
     visited = {start}
-    path = {}
+    parents = grid.parents
+    parents.clear()
 
     while stack:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-
         current = stack.pop()
 
         if current == end:
-            while current in path:
-                current = path[current]
-                current.make_path()
-                draw()
-            end.make_end()
-            start.make_start()
-            return True
+            return show_path(draw, grid, start, end)
 
         for neighbor in current.neighbors:
             if neighbor not in visited and not neighbor.is_barrier():
                 visited.add(neighbor)
-                path[neighbor] = current
+                parents.set(neighbor.index, current.index)
                 stack.append(neighbor)
                 neighbor.make_open()
 
@@ -146,12 +192,16 @@ def astar(draw: callable, grid: Grid, start: Spot, end: Spot) -> bool:
     Returns:
         bool: True if a path is found, False otherwise.
     """
+    if not grid.connected(start, end):
+        return False
+
     count = 0
     open_set = PriorityQueue()
     open_set.put((0, count, start))
     open_set_hash = {start}
 
-    came_from = {}
+    parents = grid.parents
+    parents.clear()
 
     g_score = {spot: float("inf") for row in grid.grid for spot in row}
     f_score = {spot: float("inf") for row in grid.grid for spot in row}
@@ -159,29 +209,17 @@ def astar(draw: callable, grid: Grid, start: Spot, end: Spot) -> bool:
     f_score[start] = h_manhattan_distance(start.get_position(), end.get_position())
 
     while not open_set.empty():
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                return False
-
         current = open_set.get()[2]
         open_set_hash.remove(current)
 
         if current == end:
-            while current in came_from:
-                current = came_from[current]
-                current.make_path()
-                draw()
-            end.make_end()
-            start.make_start()
-            return True
+            return show_path(draw, grid, start, end)
 
         for neighbor in current.neighbors:
             temp_g_score = g_score[current] + 1
 
             if temp_g_score < g_score[neighbor]:
-                came_from[neighbor] = current
+                parents.set(neighbor.index, current.index)
                 g_score[neighbor] = temp_g_score
                 f_score[neighbor] = temp_g_score + h_manhattan_distance(neighbor.get_position(), end.get_position())
 
@@ -198,33 +236,179 @@ def astar(draw: callable, grid: Grid, start: Spot, end: Spot) -> bool:
 
     return False
 
+def weighted_astar(draw: callable, grid: Grid, start: Spot, end: Spot, epsilon: float = 2.0) -> bool:
+    """
+    Weighted A* Pathfinding Algorithm: A* with the heuristic multiplied by epsilon.
+    It expands far fewer spots than A* on hard maps; the path found costs at most epsilon times the optimal one.
+    Args:
+        draw (callable): A function to call to update the Pygame window.
+        grid (Grid): The Grid object containing the spots.
+        start (Spot): The starting spot.
+        end (Spot): The ending spot.
+        epsilon (float): The weight of the heuristic (1 is plain A*).
+    Returns:
+        bool: True if a path is found, False otherwise.
+    """
+    if not grid.connected(start, end):
+        return False
+
+    count = 0
+    open_set = PriorityQueue()
+    open_set.put((0, count, start))
+    open_set_hash = {start}
+
+    parents = grid.parents
+    parents.clear()
+    g_score = {start: 0}
+
+    while not open_set.empty():
+        current = open_set.get()[2]
+        open_set_hash.remove(current)
+
+        if current == end:
+            return show_path(draw, grid, start, end)
+
+        for neighbor in current.neighbors:
+            temp_g_score = g_score[current] + 1
+
+            if temp_g_score < g_score.get(neighbor, float("inf")):
+                parents.set(neighbor.index, current.index)
+                g_score[neighbor] = temp_g_score
+                f_score = temp_g_score + epsilon * h_manhattan_distance(neighbor.get_position(), end.get_position())
+
+                if neighbor not in open_set_hash:
+                    count += 1
+                    open_set.put((f_score, count, neighbor))
+                    open_set_hash.add(neighbor)
+                    neighbor.make_open()
+
+        draw()
+
+        if current != start:
+            current.make_closed()
+
+    return False
+
+
+def ara(draw: callable, grid: Grid, start: Spot, end: Spot, time_budget: float = None, max_expansions: int = None,
+        epsilon: float = 3.0, epsilon_step: float = 0.5, on_solution: callable = None) -> bool:
+    """
+    Anytime Repairing A* (ARA*): finds a first path quickly with a large heuristic weight, then lowers
+    the weight and repairs the search (reusing its previous work) to find better paths, until the path
+    is optimal (epsilon = 1) or the budget runs out. Each path found is drawn, replacing the previous one.
+    Args:
+        draw (callable): A function to call to update the Pygame window.
+        grid (Grid): The Grid object containing the spots.
+        start (Spot): The starting spot.
+        end (Spot): The ending spot.
+        time_budget (float): Seconds after which the best path found so far is kept. No limit if None.
+        max_expansions (int): Number of expanded spots after which the best path found so far is kept. No limit if None.
+        epsilon (float): The weight of the heuristic for the first path.
+        epsilon_step (float): How much the weight is lowered after each path.
+        on_solution (callable): Called as on_solution(path, epsilon) with the cell indices (array('i')) of every path found, if given.
+    Returns:
+        bool: True if a path is found within the budget, False otherwise.
+    """
+    if not grid.connected(start, end):
+        return False
+
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    expansions = 0
+    goal = end.get_position()
+
+    def key(spot: Spot) -> float:
+        return g_score[spot] + epsilon * h_manhattan_distance(spot.get_position(), goal)
+
+    count = 0
+    g_score = {start: 0}
+    parents = grid.parents
+    parents.clear()
+    open_heap = [(key(start), count, start)]
+    open_set_hash = {start}
+    closed = set()
+    inconsistent = set()  # spots improved after being expanded in the current pass
+    path = []
+
+    while True:
+        # improve the current path until no spot in the open set can lead to a better one
+        while open_heap and open_heap[0][0] < g_score.get(end, float("inf")):
+            if (deadline is not None and time.perf_counter() >= deadline) or \
+                    (max_expansions is not None and expansions >= max_expansions):
+                parents.load(path)  # the pass was cut short: keep the published path, not the half-repaired tree
+                return bool(path)
+
+            f, _, current = heapq.heappop(open_heap)
+            if current not in open_set_hash or f != key(current):
+                continue  # stale entry, the spot was pushed again with a better key
+            open_set_hash.remove(current)
+            closed.add(current)
+            expansions += 1
+
+            for neighbor in current.neighbors:
+                temp_g_score = g_score[current] + 1
+                if temp_g_score < g_score.get(neighbor, float("inf")):
+                    parents.set(neighbor.index, current.index)
+                    g_score[neighbor] = temp_g_score
+                    if neighbor in closed:
+                        inconsistent.add(neighbor)
+                    else:
+                        count += 1
+                        heapq.heappush(open_heap, (key(neighbor), count, neighbor))
+                        open_set_hash.add(neighbor)
+                        if neighbor != end:
+                            neighbor.make_open()
+
+            draw()
+
+            if current != start and current != end:
+                current.make_closed()
+
+        if end not in g_score:
+            return bool(path)
+
+        # publish the new path, replacing the previous one
+        for index in path[1:-1]:
+            spot_at(grid, index).make_closed()
+        path = parents.path(end.index)
+        show_path(draw, grid, start, end)
+        if on_solution is not None:
+            on_solution(path, epsilon)
+
+        if epsilon <= 1:
+            return True
+
+        # lower the weight and start a new pass from the open and inconsistent spots
+        epsilon = max(1.0, epsilon - epsilon_step)
+        open_set_hash |= inconsistent
+        inconsistent = set()
+        closed = set()
+        open_heap = []
+        for spot in open_set_hash:
+            count += 1
+            open_heap.append((key(spot), count, spot))
+        heapq.heapify(open_heap)
+
+
 def dls(draw: callable, grid: Grid, start: Spot, end: Spot, depth_limit: int) -> bool:
+    if not grid.connected(start, end):
+        return False
+
     visited = {start}
     stack = [(start, 0)]
-    path = {}
+    parents = grid.parents
+    parents.clear()
 
     while stack:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                return False
-
         current, depth = stack.pop()
 
         if current == end:
-            while current in path:
-                current = path[current]
-                current.make_path()
-                draw()
-            end.make_end()
-            start.make_start()
-            return True
+            return show_path(draw, grid, start, end)
 
         if depth < depth_limit:
             for neighbor in current.neighbors:
                 if neighbor not in visited and not neighbor.is_barrier():
                     visited.add(neighbor)
-                    path[neighbor] = current
+                    parents.set(neighbor.index, current.index)
                     stack.append((neighbor, depth + 1))
                     neighbor.make_open()
 
@@ -237,39 +421,31 @@ def dls(draw: callable, grid: Grid, start: Spot, end: Spot, depth_limit: int) ->
 
 
 def ucs(draw: callable, grid: Grid, start: Spot, end: Spot) -> bool:
+    if not grid.connected(start, end):
+        return False
 
     count = 0
     open_set = PriorityQueue()
     open_set.put((0, count, start))
     open_set_hash = {start}
 
-    came_from = {}
+    parents = grid.parents
+    parents.clear()
     cost = {spot: float("inf") for row in grid.grid for spot in row}
     cost[start] = 0
 
     while not open_set.empty():
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                return False
-
         current_cost, _,  current = open_set.get()
         open_set_hash.remove(current)
 
         if current == end:
-            while current in came_from:
-                current = came_from[current]
-                current.make_path()
-                draw()
-            end.make_end()
-            start.make_start()
-            return True
+            return show_path(draw, grid, start, end)
 
         for neighbor in current.neighbors:
             new_cost = cost[current] + 1
 
             if new_cost < cost[neighbor]:
-                came_from[neighbor] = current
+                parents.set(neighbor.index, current.index)
                 cost[neighbor] = new_cost
 
                 if neighbor not in open_set_hash:
@@ -284,37 +460,30 @@ def ucs(draw: callable, grid: Grid, start: Spot, end: Spot) -> bool:
     return False
 
 def dijkstra(draw: callable, grid: Grid, start: Spot, end: Spot) -> bool:
+    if not grid.connected(start, end):
+        return False
+
     count = 0
     open_set = PriorityQueue()
     open_set.put((0, count, start))
     open_set_hash = {start}
 
-    came_from = {}
+    parents = grid.parents
+    parents.clear()
     distance = {spot: float("inf") for row in grid.grid for spot in row}
     distance[start] = 0
 
     while not open_set.empty():
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                return False
-
         current_distance, _, current = open_set.get()
         open_set_hash.remove(current)
 
         if current == end:
-            while current in came_from:
-                current = came_from[current]
-                current.make_path()
-                draw()
-            end.make_end()
-            start.make_start()
-            return True
+            return show_path(draw, grid, start, end)
 
         for neighbor in current.neighbors:
             new_distance = distance[current] + 1
             if new_distance < distance[neighbor]:
-                came_from[neighbor] = current
+                parents.set(neighbor.index, current.index)
                 distance[neighbor] = new_distance
 
                 if neighbor not in open_set_hash:
@@ -332,6 +501,9 @@ def dijkstra(draw: callable, grid: Grid, start: Spot, end: Spot) -> bool:
 
 
 def iddfs(draw: callable, grid: Grid, start: Spot, end: Spot, depth_limit: int) -> bool:
+    if not grid.connected(start, end):
+        return False
+
     for limit in range(depth_limit):
         if dls(draw, grid, start, end, limit):
             return True
@@ -340,14 +512,12 @@ def iddfs(draw: callable, grid: Grid, start: Spot, end: Spot, depth_limit: int)
 
 
 def ida(draw: callable, grid: Grid, start: Spot, end: Spot) -> bool:
+    if not grid.connected(start, end):
+        return False
+
     threshold = h_manhattan_distance(start.get_position(), end.get_position())
 
     while threshold < float("inf"):
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                return False
-
         for row in grid.grid:
             for spot in row:
                 if not spot.is_barrier() and spot != start and spot != end:
@@ -359,11 +529,6 @@ def ida(draw: callable, grid: Grid, start: Spot, end: Spot) -> bool:
         result_path = []
 
         while stack:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    return False
-
             current, path_set, g, path = stack.pop()
 
             f = g + h_manhattan_distance(current.get_position(), end.get_position())
@@ -393,12 +558,8 @@ def ida(draw: callable, grid: Grid, start: Spot, end: Spot) -> bool:
             draw()
 
         if found and result_path:
-            for spot in result_path:
-                spot.make_path()
-            draw()
-            end.make_end()
-            start.make_start()
-            return True
+            grid.parents.load([spot.index for spot in result_path])
+            return show_path(draw, grid, start, end)
 
         if min_threshold == float("inf"):
             return False
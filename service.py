@@ -0,0 +1,273 @@
+# service.py - Local path planning service (newline-delimited JSON over a UNIX socket or localhost TCP)
+#
+# Requests are JSON objects, one per line: {"id": 1, "op": "path", "start": [row, col], "end": [row, col]}.
+# Operations: "path" (cells of a shortest path and its length), "distance" (length only),
+# "info" (size of the map) and "stats" (latency percentiles and batching counters).
+# Every response carries the id of its request: {"id": 1, "ok": true, "distance": 12, "path": [[row, col], ...]}.
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bitboard import Bitboard
+from components import ComponentIndex
+from maps import read_map
+from profiler import RingHistogram
+
+DEFAULT_SOCKET = '/tmp/path-planner.sock'
+
+# the map of a worker process, loaded once by _init_worker
+_worker: dict = {}
+
+
+def _init_worker(map_path: str) -> None:
+    """
+    Load the map in a worker process of the pool.
+    Args:
+        map_path (str): The path of the map file.
+    Returns:
+        None
+    """
+    rows, cols, cells = read_map(map_path)
+    _worker['rows'] = rows
+    _worker['bitboard'] = Bitboard.from_cells(rows, cols, cells)
+    _worker['components'] = ComponentIndex(rows, cols, cells)
+
+
+def _answer(query: tuple) -> dict:
+    """
+    Answer one query in a worker process.
+    Args:
+        query (tuple): (op, start index, end index).
+    Returns:
+        dict: The fields of the response.
+    """
+    op, start, end = query
+    rows = _worker['rows']
+    if not _worker['components'].connected(start, end):
+        return {'distance': None, 'path': None} if op == 'path' else {'distance': None}
+    if op == 'distance':
+        return {'distance': _worker['bitboard'].distance(start, end)}
+    path = _worker['bitboard'].shortest_path(start, end)
+    return {'distance': len(path) - 1, 'path': [[index % rows, index // rows] for index in path]}
+
+
+def _run_batch(queries: list[tuple]) -> list[dict]:
+    """
+    Answer a batch of queries in a worker process, so that one round trip to the pool serves many requests.
+    Args:
+        queries (list[tuple]): The queries, see _answer().
+    Returns:
+        list[dict]: The answers, in the same order.
+    """
+    return [_answer(query) for query in queries]
+
+
+class PlannerService:
+    def __init__(self, map_path: str, workers: int, batch_size: int = 32, batch_window_ms: float = 2.0):
+        """
+        Answer path and distance queries on a map with a pool of worker processes.
+        Identical queries that arrive while one of them is being answered share that answer, and
+        queries are grouped into batches of up to `batch_size` before being sent to the pool.
+        Args:
+            map_path (str): The path of the map file.
+            workers (int): Number of worker processes.
+            batch_size (int): Largest number of queries sent to a worker at once.
+            batch_window_ms (float): How long to wait for more queries before sending a batch that is not full.
+        """
+        self.rows, self.cols, _ = read_map(map_path)
+        self.pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(map_path,))
+        self.batch_size: int = batch_size
+        self.batch_window: float = batch_window_ms / 1000
+        self.pending: asyncio.Queue | None = None
+        self.in_flight: dict[tuple, asyncio.Future] = {}
+        self.tasks: set = set()
+        self.latency: RingHistogram = RingHistogram(10000)
+        self.requests = self.coalesced = self.batches = self.batched = 0
+
+    def _index(self, position) -> int:
+        """
+        Check a [row, col] position of a request and get its cell index.
+        Args:
+            position: The position, as sent by the client.
+        Returns:
+            int: The index of the cell.
+        """
+        row, col = position
+        if not (isinstance(row, int) and isinstance(col, int) and 0 <= row < self.rows and 0 <= col < self.cols):
+            raise ValueError(f"position {position} is outside the {self.rows}x{self.cols} map")
+        return col * self.rows + row
+
+    async def query(self, op: str, start: int, end: int) -> dict:
+        """
+        Answer a path or distance query, joining an identical query if one is already in flight.
+        Args:
+            op (str): 'path' or 'distance'.
+            start (int): The index of the start cell.
+            end (int): The index of the end cell.
+        Returns:
+            dict: The fields of the response.
+        """
+        key = (op, start, end)
+        future = self.in_flight.get(key)
+        if future is None:
+            future = self.in_flight[key] = asyncio.get_running_loop().create_future()
+            self.pending.put_nowait((key, future))
+        else:
+            self.coalesced += 1
+        # shielded, so a client that goes away does not cancel the answer for the others
+        return await asyncio.shield(future)
+
+    async def _batcher(self) -> None:
+        """
+        Group the pending queries into batches and hand them to the pool.
+        Returns:
+            None
+        """
+        while True:
+            batch = [await self.pending.get()]
+            if self.pending.qsize() < self.batch_size - 1:
+                await asyncio.sleep(self.batch_window)
+            while len(batch) < self.batch_size and not self.pending.empty():
+                batch.append(self.pending.get_nowait())
+            task = asyncio.create_task(self._run(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _run(self, batch: list) -> None:
+        """
+        Run a batch in the pool and resolve the futures of its queries.
+        Args:
+            batch (list): (key, future) pairs.
+        Returns:
+            None
+        """
+        self.batches += 1
+        self.batched += len(batch)
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.pool, _run_batch, [key for key, _ in batch])
+        except Exception as error:
+            for _, future in batch:
+                future.set_exception(error)
+        else:
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+        finally:
+            for key, _ in batch:
+                self.in_flight.pop(key, None)
+
+    def stats(self) -> dict:
+        """
+        Get the latency percentiles (in milliseconds) and the batching counters.
+        Returns:
+            dict: The statistics.
+        """
+        return {
+            'requests': self.requests,
+            'coalesced': self.coalesced,
+            'batches': self.batches,
+            'mean_batch': self.batched / self.batches if self.batches else 0.0,
+            'latency_ms': self.latency.summary(),
+        }
+
+    async def _respond(self, line: bytes, writer: asyncio.StreamWriter) -> None:
+        """
+        Answer one request line and write the response.
+        Args:
+            line (bytes): The request.
+            writer (asyncio.StreamWriter): Where to write the response.
+        Returns:
+            None
+        """
+        received = time.perf_counter()
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            op = request.get('op')
+            if op in ('path', 'distance'):
+                self.requests += 1
+                response = await self.query(op, self._index(request['start']), self._index(request['end']))
+                self.latency.add((time.perf_counter() - received) * 1000)
+            elif op == 'info':
+                response = {'rows': self.rows, 'cols': self.cols}
+            elif op == 'stats':
+                response = self.stats()
+            else:
+                raise ValueError(f"unknown op {op!r}")
+            response = {'id': request_id, 'ok': True, **response}
+        except Exception as error:
+            response = {'id': request_id, 'ok': False, 'error': str(error)}
+        writer.write(json.dumps(response).encode() + b'\n')
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Serve one client connection; its requests are answered concurrently and may be answered out of order.
+        Args:
+            reader (asyncio.StreamReader): The incoming side of the connection.
+            writer (asyncio.StreamWriter): The outgoing side of the connection.
+        Returns:
+            None
+        """
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self._respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                await writer.drain()
+            if tasks:
+                await asyncio.wait(tasks)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path: str = None, host: str = '127.0.0.1', port: int = None) -> None:
+        """
+        Listen on a UNIX socket (or on a localhost TCP port) until cancelled.
+        Args:
+            socket_path (str): The path of the UNIX socket.
+            host (str): The host to listen on when `port` is given.
+            port (int): The TCP port; if None, the UNIX socket is used.
+        Returns:
+            None
+        """
+        self.pending = asyncio.Queue()
+        batcher = asyncio.create_task(self._batcher())
+        if port is None:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            server = await asyncio.start_unix_server(self.handle, socket_path)
+            print(f"Serving {self.rows}x{self.cols} map on {socket_path}")
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+            print(f"Serving {self.rows}x{self.cols} map on {host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            self.pool.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local path planning service")
+    parser.add_argument("--map", required=True, help="map file ('#' for barriers, one line per screen row)")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="path of the UNIX socket to listen on")
+    parser.add_argument("--port", type=int, default=None, help="listen on this localhost TCP port instead")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--batch-size", type=int, default=32, help="largest number of queries per batch")
+    parser.add_argument("--batch-window-ms", type=float, default=2.0,
+                        help="how long to wait for more queries before sending a batch that is not full")
+    args = parser.parse_args()
+
+    service = PlannerService(args.map, args.workers, args.batch_size, args.batch_window_ms)
+    try:
+        asyncio.run(service.serve(args.socket, port=args.port))
+    except KeyboardInterrupt:
+        pass
@@ -2,7 +2,7 @@ from utils import *
 
 class Spot:
     # --- Constructor ---
-    def __init__(self, row: int, col: int, width: int, height: int, total_rows: int):
+    def __init__(self, row: int, col: int, width: int, height: int, total_rows: int, owner: "Grid" = None):
         """
         Initialize a spot in the grid.
         Args: 
@@ -11,6 +11,7 @@ class Spot:
             width (int): The width of the spot.
             height (int): The height of the spot.
             total_rows (int): Keeps track of the total number of rows in the grid (while avoiding global variables).
+            owner (Grid | None): The grid this spot belongs to; the spot mirrors its state into the grid's `cells` array.
         """
         # a square has a position in the grid (row, col) and a position in the window (x, y)
         self.row: int = row
@@ -24,6 +25,9 @@ class Spot:
         self.color: tuple = COLORS["BACKGROUND"]  # default color is white
         self.neighbors: list = []
         self.total_rows: int = total_rows
+        # position of the spot in the `cells` array of its grid (stored in screen order, one row of pixels after another)
+        self.index: int = col * total_rows + row
+        self.owner: "Grid" = owner
 
     # ---- Methods to change the state of the spot (i.e., its setters) ----
     def get_position(self) -> tuple[int, int]:
@@ -75,13 +79,32 @@ class Spot:
         return self.color == COLORS['TURQUOISE']
 
     # ---- Methods to change the state of the spot (i.e., its setters) ----
+    def _set_state(self, name: str) -> None:
+        """
+        Change the color of the spot and mirror the new state into the cells array of its grid.
+        The grid is also told when the spot becomes or stops being a barrier, and the change is
+        recorded if a trace of the grid is being recorded.
+        Args:
+            name (str): The name of the color (a key of STATES).
+        Returns:
+            None
+        """
+        was_barrier = self.color == COLORS['BLACK']
+        self.color = COLORS[name]
+        if self.owner is not None:
+            self.owner.cells[self.index] = STATES[name]
+            if self.owner.trace is not None:
+                self.owner.trace.record(self.index, STATES[name])
+            if was_barrier != (name == 'BLACK'):
+                self.owner.barrier_changed(self)
+
     def reset(self) -> None:
         """
         Change the color of the spot back to white (unvisited).
         Returns:
             None
         """
-        self.color = COLORS['BACKGROUND']
+        self._set_state('BACKGROUND')
 
     def make_closed(self) -> None:
         """
@@ -89,7 +112,7 @@ class Spot:
         Returns:
             None
         """
-        self.color = COLORS['RED']
+        self._set_state('RED')
 
     def make_open(self) -> None:
         """
@@ -97,7 +120,7 @@ class Spot:
         Returns:
             None
         """
-        self.color = COLORS['GREEN']
+        self._set_state('GREEN')
 
     def make_barrier(self) -> None:
         """
@@ -105,7 +128,7 @@ class Spot:
         Returns:
             None
         """
-        self.color = COLORS['BLACK']
+        self._set_state('BLACK')
 
     def make_start(self) -> None:
         """
@@ -113,7 +136,7 @@ class Spot:
         Returns:
             None
         """
-        self.color = COLORS['ORANGE']
+        self._set_state('ORANGE')
 
     def make_end(self) -> None:
         """
@@ -121,7 +144,7 @@ class Spot:
         Returns:
             None
         """
-        self.color = COLORS['YELLOW']
+        self._set_state('YELLOW')
 
     def make_path(self) -> None:
         """
@@ -129,7 +152,7 @@ class Spot:
         Returns:
             None
         """
-        self.color = COLORS['PURPLE']
+        self._set_state('PURPLE')
 
     # --- Operators ---
     # "Spot" type is not yet defined because the class will be defined at runtime and will exist only after it is closed (the whole class).
@@ -142,13 +165,14 @@ class Spot:
         return False
     
     # --- Other Methods ---
-    def draw(self, win: pygame.Surface) -> None:
+    def draw(self, win: "pygame.Surface") -> None:
         """
         Draw the spot on the given Pygame surface (window).
         Args:
             win (pygame.Surface): The Pygame surface (window) where the spot will be drawn.
         """
         # draw a rectangle at (x, y) with size (width, width) and color self.color
+        import pygame
         pygame.draw.rect(win, self.color, (self.x, self.y, self.width, self.width))
 
     def update_neighbors(self, grid: list[list["Spot"]]) -> None:
@@ -167,7 +191,7 @@ class Spot:
         if self.row > 0 and not grid[self.row - 1][self.col].is_barrier():
             self.neighbors.append(grid[self.row - 1][self.col])
         # RIGHT
-        if self.col < self.total_rows - 1 and not grid[self.row][self.col + 1].is_barrier():
+        if self.col < len(grid[self.row]) - 1 and not grid[self.row][self.col + 1].is_barrier():
             self.neighbors.append(grid[self.row][self.col + 1])
         # LEFT
         if self.col > 0 and not grid[self.row][self.col - 1].is_barrier():
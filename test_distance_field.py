@@ -0,0 +1,77 @@
+# test_distance_field.py - Tests of following a distance field back to its source
+import math
+import random
+
+import numpy as np
+
+from distance_field import distance_field, descend, DIAGONAL_COST
+
+
+def path_cost(path: list[int], width: int, cost: np.ndarray = None) -> float:
+    """
+    Get the cost of a path found by descend(), as the field counts it (from the source to the start).
+    Args:
+        path (list[int]): The indices of the cells from the start to the source.
+        width (int): The width of the grid (its number of rows).
+        cost (np.ndarray): The per-cell costs, if any.
+    Returns:
+        float: The cost of entering every cell of the path but the source.
+    """
+    flat_cost = cost.ravel() if cost is not None else None
+    total = 0.0
+    for a, b in zip(path, path[1:]):
+        diagonal = a % width != b % width and a // width != b // width
+        total += (DIAGONAL_COST if diagonal else 1.0) * (1.0 if flat_cost is None else flat_cost[a])
+    return total
+
+
+def random_free(rng: random.Random, height: int, width: int, density: float) -> np.ndarray:
+    """
+    Make a random occupancy array.
+    Args:
+        rng (random.Random): The random generator.
+        height (int): Number of columns of the grid.
+        width (int): Number of rows of the grid.
+        density (float): Probability that a cell is a barrier.
+    Returns:
+        np.ndarray: A (height, width) boolean array, True where the cell is free.
+    """
+    return np.array([[rng.random() >= density for _ in range(width)] for _ in range(height)])
+
+
+def test_descend_follows_the_field():
+    rng = random.Random(1)
+    for diagonal in (False, True):
+        for _ in range(50):
+            free = random_free(rng, 12, 15, 0.25)
+            source = rng.randrange(free.size)
+            field = distance_field(free, [source], diagonal)
+            for start in np.flatnonzero(np.isfinite(field.ravel())):
+                path = descend(field, int(start), diagonal)
+                assert path[-1] == source
+                assert math.isclose(path_cost(path, 15), field.ravel()[start], abs_tol=1e-9)
+
+
+def test_descend_does_not_cut_corners():
+    # a barrier at (1, 1): going from (2, 2) to (0, 0) must go around it, not between it and its neighbors
+    free = np.ones((3, 3), dtype=bool)
+    free[1, 1] = False
+    free[0, 1] = False
+    field = distance_field(free, [0], diagonal=True)
+    path = descend(field, 8, diagonal=True)
+    for a, b in zip(path, path[1:]):
+        if a % 3 != b % 3 and a // 3 != b // 3:
+            assert free.ravel()[(a // 3) * 3 + b % 3] and free.ravel()[(b // 3) * 3 + a % 3]
+
+
+def test_descend_weighted_diagonal():
+    rng = random.Random(2)
+    for _ in range(50):
+        free = random_free(rng, 12, 15, 0.2)
+        cost = np.array([[rng.choice((1.0, 1.0, 3.0, 8.0)) for _ in range(15)] for _ in range(12)])
+        source = rng.randrange(free.size)
+        field = distance_field(free, [source], diagonal=True, cost=cost)
+        for start in np.flatnonzero(np.isfinite(field.ravel())):
+            path = descend(field, int(start), diagonal=True, cost=cost)
+            assert path[-1] == source
+            assert math.isclose(path_cost(path, 15, cost), field.ravel()[start], abs_tol=1e-9)
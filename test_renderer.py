@@ -0,0 +1,48 @@
+# test_renderer.py - Tests of the grid renderer at zooms below 1:1
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from utils import *
+from grid import Grid
+
+
+def draw_at_scale(rows: int, cols: int, width: int, height: int, barrier: tuple[int, int]) -> tuple[Grid, pygame.Surface]:
+    """
+    Draw a grid with a single barrier cell, zoomed to fit the window.
+    Args:
+        rows (int): Number of rows in the grid.
+        cols (int): Number of columns in the grid.
+        width (int): Width of the window in pixels.
+        height (int): Height of the window in pixels.
+        barrier (tuple[int, int]): The (row, col) of the barrier.
+    Returns:
+        tuple[Grid, pygame.Surface]: The grid and the surface it was drawn on.
+    """
+    pygame.init()
+    win = pygame.Surface((width, height))
+    win.fill(COLORS['WHITE'])
+    grid = Grid(win, rows, cols, width, height)
+    row, col = barrier
+    grid.grid[row][col].make_barrier()
+    grid.renderer.draw(win)
+    return grid, win
+
+
+def test_single_barrier_drawn_below_one_to_one():
+    # 400 cells in 300 pixels: 0.75 pixels per cell, still drawn from the cells surface, not a mip level
+    grid, win = draw_at_scale(400, 400, 300, 300, (200, 200))
+    assert grid.viewport.scale == 0.75
+    x, y = grid.viewport.cell_to_screen(200, 200)
+    assert win.get_at((int(x), int(y)))[:3] == COLORS['BLACK']
+
+
+def test_mip_level_zero_rejected():
+    grid, _ = draw_at_scale(64, 64, 64, 64, (0, 0))
+    try:
+        grid.renderer._mip_level(0)
+    except AssertionError:
+        return
+    raise AssertionError("_mip_level(0) should be rejected")
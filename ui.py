@@ -4,6 +4,30 @@ from utils import *
 from searching_algorithms import *
 
 
+# rendered text surfaces, keyed by (font, text, color); labels barely change, so they are rendered once
+_text_cache: dict = {}
+TEXT_CACHE_SIZE = 256
+
+
+def render_text(font: pygame.font.Font, text: str, color: tuple) -> pygame.Surface:
+    """
+    Render a line of text, reusing the surface rendered the last time the same text was asked for.
+    Args:
+        font (pygame.font.Font): The font used for the text.
+        text (str): The text to render.
+        color (tuple): The color of the text.
+    Returns:
+        pygame.Surface: The rendered text.
+    """
+    key = (font, text, color)
+    surface = _text_cache.get(key)
+    if surface is None:
+        if len(_text_cache) >= TEXT_CACHE_SIZE:
+            _text_cache.clear()
+        surface = _text_cache[key] = font.render(text, True, color)
+    return surface
+
+
 class Button:
 
 
@@ -23,7 +47,7 @@ class Button:
         pygame.draw.rect(win, color, self.rect, border_radius=5)
         pygame.draw.rect(win, COLORS['GREY'], self.rect, 2, border_radius=5)
 
-        text_surface = font.render(self.text, True, COLORS['TEXT'])
+        text_surface = render_text(font, self.text, COLORS['TEXT'])
         text_rect = text_surface.get_rect(center=self.rect.center)
         win.blit(text_surface, text_rect)
 
@@ -54,16 +78,19 @@ class UI:
 
 
         self.button_width = 160
-        self.button_height = 40
+        self.button_height = 34
         self.button_x = grid_width + 20
-        self.button_spacing = 10
+        self.button_spacing = 8
         self.start_y = 20
 
 
         self.algorithms = [
             ("BFS", bfs, None),
+            ("BFS (bitboard)", bfs_bitboard, None),
             ("DFS", dfs, None),
             ("A*", astar, None),
+            ("Weighted A*", weighted_astar, 2.0),
+            ("ARA*", ara, 5.0),
             ("DLS", dls, 1000),
             ("UCS", ucs, None),
             ("Dijkstra", dijkstra, None),
@@ -97,9 +124,22 @@ class UI:
         )
 
 
+        self.cancel_button = Button(
+            self.button_x,
+            self.reset_button.rect.bottom + self.button_spacing,
+            self.button_width,
+            self.button_height,
+            "Cancel Search",
+            COLORS['PINK'],
+            (200, 60, 80)
+        )
+
+
         self.selected_algorithm = None
         self.selected_algo_name = "None"
         self.selected_algo_param = None
+        self.status = ""
+        self.status_surface: tuple | None = None  # (text, surface) of the last status drawn
 
     def draw_panel(self) -> None:
 
@@ -111,12 +151,19 @@ class UI:
 
 
         self.reset_button.draw(self.win, self.font)
+        self.cancel_button.draw(self.win, self.font)
 
 
-        selection_y = self.reset_button.rect.bottom + 30
-        sel_text = self.small_font.render(f"Selected: {self.selected_algo_name}", True, COLORS['WHITE'])
+        selection_y = self.cancel_button.rect.bottom + 30
+        sel_text = render_text(self.small_font, f"Selected: {self.selected_algo_name}", COLORS['WHITE'])
         self.win.blit(sel_text, (self.button_x, selection_y))
 
+        if self.status:
+            # the status changes at every search step, so only its last rendering is kept (not in the text cache)
+            if self.status_surface is None or self.status_surface[0] != self.status:
+                self.status_surface = (self.status, self.small_font.render(self.status, True, COLORS['WHITE']))
+            self.win.blit(self.status_surface[1], (self.button_x, selection_y + 25))
+
 
 
     def handle_events(self, event: pygame.event.Event) -> dict:
@@ -141,10 +188,14 @@ class UI:
         if self.reset_button.handle_event(event):
             return {'type': 'reset'}
 
+        if self.cancel_button.handle_event(event):
+            return {'type': 'cancel'}
+
 
         for button, _, _, _ in self.algo_buttons:
             button.handle_event(event)
         self.reset_button.handle_event(event)
+        self.cancel_button.handle_event(event)
 
         return {'type': None}
 
@@ -1,9 +1,11 @@
-import pygame
+# no pygame here: the search and grid modules import this, and must load without it (see import_budget.py)
 
 # some global constants
 WIDTH = 900
 HEIGHT = 700
 GRID_WIDTH = 700
+FPS = 60                # upper bound on the frame rate of the main loop
+IDLE_TIMEOUT_MS = 500   # how long the main loop sleeps waiting for an event when nothing changes
 
 # colors.
 # if you find it more suitable, change this dictionary to standalone constants like: RED = (255, 0, 0)
@@ -28,4 +30,11 @@ COLORS = {
     'PINK_G' : (80, 70, 75),
     'TEXT': (248, 249, 250),
 
-}
\ No newline at end of file
+}
+
+# cell states, used as palette indices.
+# every spot mirrors its state into the `cells` byte array of its grid, so the whole grid
+# can be rendered (or read by the search engines) without touching the Spot objects.
+STATE_NAMES = ['BACKGROUND', 'BLACK', 'ORANGE', 'YELLOW', 'GREEN', 'RED', 'PURPLE', 'TURQUOISE']
+STATES = {name: index for index, name in enumerate(STATE_NAMES)}
+PALETTE = [COLORS[name] for name in STATE_NAMES]
@@ -0,0 +1,101 @@
+# viewport.py - Camera over the grid (zoom and pan)
+import math
+
+
+class Viewport:
+    MIN_SCALE = 1 / 64   # pixels per cell when fully zoomed out
+    MAX_SCALE = 64       # pixels per cell when fully zoomed in
+
+    def __init__(self, rows: int, cols: int, width: int, height: int):
+        """
+        Initialize a camera looking at a grid of rows x cols cells through an area of width x height pixels.
+        Like the spots, cells are addressed by (row, col), where row grows along the x axis of the window.
+        Args:
+            rows (int): Number of rows in the grid.
+            cols (int): Number of columns in the grid.
+            width (int): Width of the grid area in pixels.
+            height (int): Height of the grid area in pixels.
+        """
+        self.rows: int = rows
+        self.cols: int = cols
+        self.width: int = width
+        self.height: int = height
+        self.scale: float = 1.0     # pixels per cell
+        self.offset_x: float = 0.0  # cell coordinates shown in the top left corner
+        self.offset_y: float = 0.0
+        self.fit()
+
+    def fit(self) -> None:
+        """
+        Zoom and pan so that the whole grid is visible. Cells get a whole number of pixels whenever they fit.
+        Returns:
+            None
+        """
+        scale = min(self.width // self.rows, self.height // self.cols)
+        if scale < 1:
+            scale = min(self.width / self.rows, self.height / self.cols)
+        self.scale = scale
+        self.offset_x = 0.0
+        self.offset_y = 0.0
+
+    def screen_to_cell(self, pos: tuple[int, int]) -> tuple[int, int]:
+        """
+        Get the cell under a point of the window. The result can be outside the grid.
+        Args:
+            pos (tuple[int, int]): The (x, y) position in the window.
+        Returns:
+            tuple[int, int]: The (row, col) of the cell under that point.
+        """
+        x, y = pos
+        return math.floor(self.offset_x + x / self.scale), math.floor(self.offset_y + y / self.scale)
+
+    def cell_to_screen(self, row: float, col: float) -> tuple[float, float]:
+        """
+        Get the window position of the top left corner of a cell.
+        Args:
+            row (float): The row of the cell.
+            col (float): The column of the cell.
+        Returns:
+            tuple[float, float]: The (x, y) position in the window.
+        """
+        return (row - self.offset_x) * self.scale, (col - self.offset_y) * self.scale
+
+    def visible_cells(self) -> tuple[int, int, int, int]:
+        """
+        Get the range of cells that are at least partially visible, clamped to the grid.
+        Returns:
+            tuple[int, int, int, int]: (row_start, col_start, row_end, col_end), ends excluded.
+        """
+        row_start = max(0, math.floor(self.offset_x))
+        col_start = max(0, math.floor(self.offset_y))
+        row_end = min(self.rows, math.ceil(self.offset_x + self.width / self.scale))
+        col_end = min(self.cols, math.ceil(self.offset_y + self.height / self.scale))
+        return row_start, col_start, max(row_start, row_end), max(col_start, col_end)
+
+    def zoom(self, factor: float, pos: tuple[int, int]) -> None:
+        """
+        Zoom in (factor > 1) or out (factor < 1), keeping the point under `pos` in place.
+        Args:
+            factor (float): How much the scale is multiplied by.
+            pos (tuple[int, int]): The (x, y) position in the window to zoom around.
+        Returns:
+            None
+        """
+        x, y = pos
+        anchor_x = self.offset_x + x / self.scale
+        anchor_y = self.offset_y + y / self.scale
+        self.scale = min(self.MAX_SCALE, max(self.MIN_SCALE, self.scale * factor))
+        self.offset_x = anchor_x - x / self.scale
+        self.offset_y = anchor_y - y / self.scale
+
+    def pan(self, dx: float, dy: float) -> None:
+        """
+        Move the view by a number of pixels.
+        Args:
+            dx (float): Horizontal movement in pixels (positive moves the grid to the left).
+            dy (float): Vertical movement in pixels (positive moves the grid up).
+        Returns:
+            None
+        """
+        self.offset_x += dx / self.scale
+        self.offset_y += dy / self.scale
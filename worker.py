@@ -0,0 +1,133 @@
+# worker.py - Runs a search on a background thread so the window stays responsive
+import threading
+import time
+from collections import deque
+
+PROGRESS_QUEUE_SIZE = 64  # progress messages kept until the render loop takes them; older step reports are dropped
+
+
+class SearchCancelled(Exception):
+    """Raised inside a running search when its cancellation token has been set."""
+
+
+class CancelToken:
+    def __init__(self):
+        """
+        A flag shared between the UI thread (which sets it) and the search thread (which checks it).
+        """
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        """
+        Ask the search to stop at its next step.
+        Returns:
+            None
+        """
+        self._event.set()
+
+    def is_cancelled(self) -> bool:
+        """
+        Checks if the search was asked to stop.
+        Returns:
+            bool: True if cancel() was called, False otherwise.
+        """
+        return self._event.is_set()
+
+    def check(self) -> None:
+        """
+        Stop the search (by raising SearchCancelled) if it was asked to.
+        Returns:
+            None
+        """
+        if self._event.is_set():
+            raise SearchCancelled()
+
+
+class SearchWorker:
+    def __init__(self, algorithm: callable, args: tuple, step_delay: float = 0.0, prepare: callable = None):
+        """
+        Prepare a search to run on a background thread.
+        The algorithm gets the worker's step function as its `draw` callback: every step checks the
+        cancellation token and reports progress through a queue that the render loop drains with poll().
+        Args:
+            algorithm (callable): The search function, called as algorithm(draw, *args).
+            args (tuple): The arguments after `draw` (grid, start, end and the optional parameter).
+            step_delay (float): Seconds to sleep after each step, so the search can be watched.
+            prepare (callable): Called on the search thread before the algorithm, for set-up work too slow
+                for the render loop (e.g. rebuilding the neighbors of every spot), if given.
+        """
+        self.algorithm: callable = algorithm
+        self.args: tuple = args
+        self.step_delay: float = step_delay
+        self.prepare: callable = prepare
+        self.token: CancelToken = CancelToken()
+        # deque.append and deque.popleft are atomic, so producer and consumer need no lock. The queue is
+        # bounded: with no step delay a search posts steps far faster than frames drain them, and only the
+        # latest step count matters, so the oldest reports are dropped (the final message is always the newest)
+        self.progress: deque = deque(maxlen=PROGRESS_QUEUE_SIZE)
+        self.steps: int = 0
+        self.thread: threading.Thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        """
+        Start the search thread.
+        Returns:
+            None
+        """
+        self.thread.start()
+
+    def cancel(self, wait: bool = False) -> None:
+        """
+        Ask the search to stop.
+        Args:
+            wait (bool): Whether to block until the search thread has finished.
+        Returns:
+            None
+        """
+        self.token.cancel()
+        if wait and self.thread.is_alive():
+            self.thread.join()
+
+    def is_running(self) -> bool:
+        """
+        Checks if the search thread is still running.
+        Returns:
+            bool: True if the search has not finished yet, False otherwise.
+        """
+        return self.thread.is_alive()
+
+    def poll(self) -> list[tuple]:
+        """
+        Take the progress messages posted since the last call.
+        Messages are ('step', steps) (only the most recent ones), then one of ('done', result), ('cancelled', None) or ('error', exception).
+        Returns:
+            list[tuple]: The messages, oldest first.
+        """
+        messages = []
+        while self.progress:
+            messages.append(self.progress.popleft())
+        return messages
+
+    def _step(self) -> None:
+        """
+        The `draw` callback of the search: a cancellation point and a progress report.
+        Returns:
+            None
+        """
+        self.token.check()
+        self.steps += 1
+        self.progress.append(('step', self.steps))
+        if self.step_delay:
+            time.sleep(self.step_delay)
+
+    def _run(self) -> None:
+        try:
+            if self.prepare is not None:
+                self.prepare()
+            result = self.algorithm(self._step, *self.args)
+        except SearchCancelled:
+            self.progress.append(('cancelled', None))
+        except Exception as error:
+            self.progress.append(('error', error))
+        else:
+            self.progress.append(('done', result))